@@ -0,0 +1,364 @@
+import argparse
+import gzip
+import hashlib
+import json
+import math
+import sys
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from dashboard import datasets
+from dashboard.cube import ALL_AGES, YOUTH_AGE_GROUP
+from dashboard.store import file_digest
+from mappings.country_registry import countries
+
+# Read-only JSON API over the precomputed files app.py charts, for other dashboards. The
+# datasets are read once at start into plain dict indexes, and every response is keyed by
+# its normalized query, so a repeated query is a cache lookup. ETags are derived from the
+# content hash of the files an endpoint serves: they change only when the data does. An
+# endpoint whose dataset could not be loaded answers 503 with the reason; the others still work.
+# Run from the repository root, next to the app: python api.py --port 8502
+#
+#   /trend?question=B008&countries=AUS,CAN&waves=5,6,7   Step 1, all ages
+#   /youth?question=B008&countries=AUS,CAN&wave=7        Step 2, under 29
+#   /co2?countries=AUS,CAN&from=1990&to=2023             Step 3
+#   /carbon-pricing?countries=AUS,CAN                    Step 4
+#   /epi?countries=AUS,CAN&year=2024                     Step 5
+#
+# Countries are ISO3 codes, or any name or code the country registry knows; a parameter
+# left out selects everything.
+
+DEFAULT_PORT = 8502  # Streamlit's is 8501
+MAX_RESPONSES = 4096  # Encoded responses kept; the least recently used one is dropped first
+GZIP_MIN_BYTES = 1024  # Smaller bodies are sent as they are
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _number(value):
+    # NaN is not valid JSON
+    return None if value is None or math.isnan(value) else float(value)
+
+
+class DataIndex:
+    """The precomputed datasets as dicts keyed the way the endpoints select them."""
+
+    def __init__(self):
+        # Hashed before reading, so a file replaced meanwhile gets a new ETag on the next start
+        self.digests = {}
+        for name, dataset in datasets.DATASETS.items():
+            try:
+                self.digests[name] = file_digest(dataset.path)
+            except OSError:  # Missing; loading it reports why
+                pass
+
+        # Dataset name -> why it could not be loaded; its index is left empty
+        self.errors = {}
+        loading = datasets.start_loading()
+
+        self.questions = {}
+        # (variable, age group) -> country -> wave -> result; combinations without a percentage are left out
+        self.results = {}
+        results_cube = self._result(loading, 'results_cube')
+        if results_cube is not None:
+            self.questions = datasets.question_options(results_cube)
+            for row in results_cube.data.reset_index().itertuples(index=False):
+                if math.isnan(row.Percentage_Favorable):
+                    continue
+                self.results.setdefault((row.Variable, int(row.Age_Group)), {}).setdefault(row.Country, {})[int(row.Wave)] = {
+                    'country': row.Country, 'wave': int(row.Wave), 'percentage': float(row.Percentage_Favorable),
+                    'ci_low': _number(row.CI_Low), 'ci_high': _number(row.CI_High),
+                }
+
+        # Country -> (year, emissions) sorted by year
+        self.co2 = {}
+        co2_data = self._result(loading, 'co2_data')
+        if co2_data is not None:
+            for row in co2_data.itertuples(index=False):
+                self.co2.setdefault(row.iso_code, []).append((int(row.year), float(row.co2_per_capita)))
+
+        # Implementation years are 0 for instruments a country does not have
+        self.carbon_pricing = {}
+        tax_data = self._result(loading, 'tax_data')
+        if tax_data is not None:
+            self.carbon_pricing = {
+                row['ISO3']: {'country': row['ISO3'], 'name': row['Country'],
+                              'carbon_tax': int(row['Carbon Tax']) or None, 'ets': int(row['ETS']) or None,
+                              'instrument_type': row['Instrument_Type']}
+                for row in tax_data.to_dict('records')
+            }
+
+        # (year, country) -> index and trend; rows without a known country are left out
+        self.epi = {}
+        epi_data = self._result(loading, 'epi_data')
+        if epi_data is not None:
+            for row in epi_data.itertuples(index=False):
+                if isinstance(row.ISO3, str):
+                    self.epi[(int(row.date), row.ISO3)] = {
+                        'country': row.ISO3, 'name': row.region, 'year': int(row.date), 'value': _number(row.value),
+                        'trend': _number(row.trend), 'rank': int(row.rank),
+                    }
+
+        # Codes the country registry may not know, e.g. NIR (Northern Ireland) in the WVS
+        self.codes = ({country for by_country in self.results.values() for country in by_country}
+                      | set(self.co2) | set(self.carbon_pricing) | {country for _, country in self.epi})
+
+    def _result(self, loading, name):
+        """The loaded dataset `name`, or None when it could not be loaded (recorded in self.errors)."""
+        try:
+            return loading[name].result()
+        except datasets.DatasetError as error:
+            self.errors[name] = str(error)
+            return None
+
+    def version(self, *names):
+        return hashlib.sha256(''.join(self.digests[name] for name in names).encode()).hexdigest()
+
+
+def _values(query, name):
+    """Comma-separated values of a query parameter, or None when it is left out."""
+    if name not in query:
+        return None
+    return [value.strip() for value in query[name][-1].split(',') if value.strip()]
+
+
+def _integer(query, name, default=None):
+    if name not in query:
+        return default
+    try:
+        return int(query[name][-1])
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be an integer") from None
+
+
+def _integers(query, name):
+    values = _values(query, name)
+    try:
+        return None if values is None else tuple(sorted({int(value) for value in values}))
+    except ValueError:
+        raise ApiError(400, f"'{name}' must be comma-separated integers") from None
+
+
+def _countries(index, query):
+    values = _values(query, 'countries')
+    if values is None:
+        return None
+    codes = [countries.iso3(value) or (value.upper() if value.upper() in index.codes else None) for value in values]
+    unknown = [value for value, code in zip(values, codes) if code is None]
+    if unknown:
+        raise ApiError(400, f"Unknown countries: {', '.join(unknown)}")
+    return tuple(sorted(set(codes)))
+
+
+def _question(index, query):
+    question = query.get('question', [None])[-1]
+    if question is None:
+        raise ApiError(400, "'question' is required")
+    if question not in index.questions:
+        raise ApiError(400, f"Unknown question '{question}'")
+    return question
+
+
+def _results(index, question, age_group, country_codes, waves):
+    by_country = index.results.get((question, age_group), {})
+    return [result
+            for country in (sorted(by_country) if country_codes is None else country_codes)
+            for wave, result in sorted(by_country.get(country, {}).items())
+            if waves is None or wave in waves]
+
+
+# Each endpoint turns the query into a normalized key (which identifies the response) and
+# the key into the response; the names are the datasets the response is read from
+def trend_key(index, query):
+    return _question(index, query), _countries(index, query), _integers(query, 'waves')
+
+
+def trend(index, question, country_codes, waves):
+    return {'question': question, 'label': index.questions[question], 'age_group': 'all',
+            'results': _results(index, question, ALL_AGES, country_codes, waves)}
+
+
+def youth_key(index, query):
+    wave = _integer(query, 'wave')
+    if wave is None:
+        raise ApiError(400, "'wave' is required")
+    return _question(index, query), _countries(index, query), wave
+
+
+def youth(index, question, country_codes, wave):
+    return {'question': question, 'label': index.questions[question], 'age_group': 'under 29', 'wave': wave,
+            'results': _results(index, question, YOUTH_AGE_GROUP, country_codes, {wave})}
+
+
+def co2_key(index, query):
+    return _countries(index, query), _integer(query, 'from', 1981), _integer(query, 'to', 2023)
+
+
+def co2(index, country_codes, first_year, last_year):
+    return {'from': first_year, 'to': last_year, 'results': [
+        {'country': country, 'year': year, 'co2_per_capita': value}
+        for country in (sorted(index.co2) if country_codes is None else country_codes)
+        for year, value in index.co2.get(country, [])
+        if first_year <= year <= last_year
+    ]}
+
+
+def carbon_pricing_key(index, query):
+    return (_countries(index, query),)
+
+
+def carbon_pricing(index, country_codes):
+    selected = sorted(index.carbon_pricing) if country_codes is None else country_codes
+    return {'results': [index.carbon_pricing[country] for country in selected if country in index.carbon_pricing]}
+
+
+def epi_key(index, query):
+    return _countries(index, query), _integer(query, 'year', 2024)
+
+
+def epi(index, country_codes, year):
+    results = [result for (result_year, country), result in index.epi.items()
+               if result_year == year and (country_codes is None or country in country_codes)]
+    return {'year': year, 'results': sorted(results, key=lambda result: result['rank'])}
+
+
+ENDPOINTS = {
+    '/trend': (trend_key, trend, ['results_cube']),
+    '/youth': (youth_key, youth, ['results_cube']),
+    '/co2': (co2_key, co2, ['co2_data']),
+    '/carbon-pricing': (carbon_pricing_key, carbon_pricing, ['tax_data']),
+    '/epi': (epi_key, epi, ['epi_data']),
+}
+
+
+class Response:
+    """An encoded response body with its strong ETag; the gzip copy is made on first request."""
+
+    def __init__(self, body, etag):
+        self.body = body
+        self.etag = etag
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            # mtime=0 keeps the bytes, and so the ETag, the same across restarts
+            self._gzipped = gzip.compress(self.body, mtime=0)
+        return self._gzipped
+
+
+@lru_cache(maxsize=MAX_RESPONSES)
+def response(index, path, key):
+    _, build, names = ENDPOINTS[path]
+    body = json.dumps(build(index, *key), separators=(',', ':')).encode()
+    tag = hashlib.sha256(f'{index.version(*names)} {path} {key!r}'.encode()).hexdigest()[:32]
+    return Response(body, tag)
+
+
+def _etag_matches(header, tag):
+    # If-None-Match compares weakly, so a W/ prefix or the -gzip variant still match
+    candidates = [candidate.strip().removeprefix('W/') for candidate in header.split(',')]
+    return '*' in candidates or f'"{tag}"' in candidates or f'"{tag}-gzip"' in candidates
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep-alive, so clients reuse connections
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def _handle(self, send_body):
+        url = urlsplit(self.path)
+        try:
+            if url.path == '/':
+                result = Response(json.dumps({'endpoints': sorted(ENDPOINTS), 'questions': self.server.index.questions},
+                                             separators=(',', ':')).encode(), None)
+            elif url.path in ENDPOINTS:
+                failed = [self.server.index.errors[name] for name in ENDPOINTS[url.path][2]
+                          if name in self.server.index.errors]
+                if failed:
+                    # Sent without an ETag, so clients do not cache it as the data
+                    raise ApiError(503, f"Data unavailable: {'; '.join(failed)}")
+                key = ENDPOINTS[url.path][0](self.server.index, parse_qs(url.query))
+                result = response(self.server.index, url.path, key)
+            else:
+                raise ApiError(404, f"Unknown path '{url.path}'")
+        except ApiError as error:
+            self._send(error.status, json.dumps({'error': str(error)}).encode(), {}, send_body)
+            return
+
+        headers = {'Vary': 'Accept-Encoding'}
+        if result.etag is not None:
+            if _etag_matches(self.headers.get('If-None-Match', ''), result.etag):
+                self._send(304, b'', {'ETag': f'"{result.etag}"', 'Cache-Control': 'no-cache'}, send_body)
+                return
+            headers.update({'ETag': f'"{result.etag}"', 'Cache-Control': 'no-cache'})
+
+        body = result.body
+        if (self.server.gzip and len(body) >= GZIP_MIN_BYTES
+                and 'gzip' in self.headers.get('Accept-Encoding', '')):
+            body = result.gzipped()
+            headers['Content-Encoding'] = 'gzip'
+            if result.etag is not None:
+                # A different representation needs its own strong ETag
+                headers['ETag'] = f'"{result.etag}-gzip"'
+        self._send(200, body, headers, send_body)
+
+    def _send(self, status, body, headers, send_body):
+        self.send_response(status)
+        if status != 304:
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class ApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # Clients connecting at once are not turned away and retried
+
+
+def make_server(host, port, use_gzip=True, verbose=False):
+    server = ApiServer((host, port), ApiHandler)
+    server.index = DataIndex()
+    server.gzip = use_gzip
+    server.verbose = verbose
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the precomputed data as a read-only JSON API.")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on (0.0.0.0 for all interfaces)")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--no-gzip', action='store_true', help="Never compress responses")
+    parser.add_argument('--verbose', action='store_true', help="Log every request to stderr")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, not args.no_gzip, args.verbose)
+    for name, error in server.index.errors.items():
+        print(f"[unavailable] {name}: {error}", file=sys.stderr, flush=True)
+    print(f"Serving the JSON API on http://{args.host}:{server.server_address[1]}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,17 @@
-import pandas as pd
-import plotly.express as px
+import os
+
 import streamlit as st
-from PIL import Image
-from mappings.country_mapping import country_info
-from mappings.variable_mappings_env import variable_mappings  # Ensure this file contains the question mappings
+from dashboard import datasets, metrics, profiling
+from dashboard.assets import HEADER_SOURCE, HEADER_WIDTHS, header_html, header_variant, header_variants
+from dashboard.cube import YOUTH_AGE_GROUP
+from dashboard.figure_cache import figure_cache
+from dashboard.figures import carbon_pricing_map, co2_figure, epi_figure, trend_figure, youth_figure
+from dashboard.store import DatasetStore, reload_seconds
+from mappings.country_registry import countries
+
+# pandas and Plotly are imported by the loaders and chart builders that use them, so the
+# header is on screen before they load on a cold start
+metrics.start_run()
 
 # Custom CSS to style the app with a unified environmental theme
 st.markdown(
@@ -61,69 +69,72 @@ st.markdown(
 )
 
 # Add a custom header image
-image_path = "img/no_planet_b.jpg"  # Replace with a relevant environmental image
-image = Image.open(image_path)
-
-st.image(image, 
-        caption="No Planet B, Photo by [Markus Spiske](https://www.pexels.com/photo/climate-road-landscape-people-2990650/)",
-        use_container_width=True)
+@st.cache_resource
+def load_header_image():
+    # Largest prebuilt copy, or the original photo until scripts/build_header_images.py has run
+    path = header_variant(max(HEADER_WIDTHS), 'jpg')
+    with open(path if os.path.exists(path) else HEADER_SOURCE, 'rb') as f:
+        return f.read()
+
+header_caption = "No Planet B, Photo by [Markus Spiske](https://www.pexels.com/photo/climate-road-landscape-people-2990650/)"
+if st.get_option('server.enableStaticServing') and all(os.path.exists(path) for path in header_variants()):
+    # Served as static files, so the browser downloads only the copy that fits its screen
+    st.markdown(header_html(), unsafe_allow_html=True)
+    st.caption(header_caption)
+else:
+    st.image(load_header_image(), caption=header_caption, use_container_width=True)
 
 # Title
 st.title("🌱 Youth, Environment, and Action: Insights from Global Data")
 
 # Divider
 st.markdown("<hr>", unsafe_allow_html=True)
-
-# Load the precomputed data with caching
-@st.cache_data
-def load_precomputed_env_data():
-    return pd.read_csv('precalculated_data/precomputed_env_data.csv')
-
-@st.cache_data
-def load_precomputed_age_data():
-    return pd.read_csv('precalculated_data/precomputed_age_data.csv')
-
-@st.cache_data
+metrics.section_done('header')
+
+# Every dataset starts loading in the background once the header is on screen, so a cold
+# start waits for the slowest file rather than all of them in turn; each section then waits
+# only for the dataset it draws. A missing or malformed file leaves out just its sections.
+# The store is shared by every session of the process: the figure cache keys charts on its
+# datasets, which are frozen (dashboard/shared.py) so no session can change what the others
+# see. A watcher reloads a dataset whose file changed and drops the figures built from the
+# previous version (dashboard/store.py).
+@st.cache_resource
+def dataset_store():
+    store = DatasetStore(on_reload=lambda name, previous: figure_cache.discard(previous))
+    store.watch(reload_seconds())
+    return store
+
+@profiling.profiled_load
+def load_results_cube():
+    return dataset_store().get('results_cube')
+
+@profiling.profiled_load
 def load_co2_data():
-    return pd.read_csv('precalculated_data/co2-data.csv')
+    return dataset_store().get('co2_data')
 
-@st.cache_data
+@profiling.profiled_load
 def load_tax_data():
-    return pd.read_csv('precalculated_data/tax_summary.csv')
+    return dataset_store().get('tax_data')
 
-# Load the EPI data (replace 'ep.csv' with the correct file path)
-@st.cache_data
+@profiling.profiled_load
 def load_epi_data():
-    return pd.read_csv('precalculated_data/epi.csv', delimiter=';')
-
-# Load data
-env_data = load_precomputed_env_data()
-age_data = load_precomputed_age_data()
-co2_data = load_co2_data()
-tax_data = load_tax_data()
-epi_data = load_epi_data()
-
-# Country mapping
-country_mapping = {info["country_3"]: info["country_name"] for info in country_info}
-
-custom_green_scale = [
-    "#99cc99",  # Soft, muted light green
-    "#33cc33",  # Bright green
-    "#00b359",  # Rich green
-    "#009933",  # Medium green
-    "#008000",  # Medium-dark green
-    "#006600",  # Dark green
-    "#004d00",  # Very dark green
-    "#003300"   # Very dark green (almost black)
-]
-
-# Filter variable_mappings to include only questions present in env_data columns
-question_options = {
-    item_code: item_label
-    for item in variable_mappings
-    for item_code, item_label in item.items()
-    if item_code in env_data.columns
-}
+    return dataset_store().get('epi_data')
+
+def load_or_warn(load, sections):
+    """The dataset `load` returns, or None after telling the reader which sections it leaves out and why."""
+    try:
+        return load()
+    except datasets.DatasetError as error:
+        st.warning(f"{sections} cannot be shown: {error}")
+        return None
+
+
+dataset_store()
+results_cube = load_or_warn(load_results_cube, "Steps 1 and 2")
+
+# Questions of mappings/variable_mappings_env.py that are present in the results cube
+question_options = datasets.question_options(results_cube) if results_cube is not None else {}
+metrics.section_done('data_load', rows=len(results_cube.data) if results_cube is not None else 0)
 
 # Step 1: World Values Survey
 st.markdown("""
@@ -131,12 +142,12 @@ st.markdown("""
 Dive into the World Values Survey to understand global perspectives on environmental issues.
 """)
 
-# Country selection
-all_countries_codes = env_data['Country'].unique()
+# Country selection; without the results cube, Step 3 still offers every known country
+all_countries_codes = results_cube.countries() if results_cube is not None else sorted(countries.records)
 
-all_countries_names = [country_mapping.get(c3, c3) for c3 in all_countries_codes]
-default_countries_codes = ['AUS', 'CAN', 'CHN', 'RUS', 'DEU', 'CHE', 'USA']
-default_countries_names = [country_mapping.get(c3, c3) for c3 in default_countries_codes]
+all_countries_names = countries.names_of(all_countries_codes)
+default_countries_codes = datasets.DEFAULT_COUNTRIES
+default_countries_names = countries.names_of(default_countries_codes)
 
 selected_countries_names = st.multiselect(
     "Select countries",
@@ -145,10 +156,11 @@ selected_countries_names = st.multiselect(
     key="country_selection"
 )
 
-selected_countries_3 = [k for k, v in country_mapping.items() if v in selected_countries_names]
+# Every dataset is filtered on ISO3 codes
+selected_countries_3 = countries.iso3_of_names(selected_countries_names)
 
 # Wave selection
-all_waves = sorted(env_data['Wave'].unique())
+all_waves = results_cube.waves() if results_cube is not None else []
 
 selected_waves = st.multiselect(
     "Select survey waves. (2: 1990-1994, 3: 1995-1999, 4: 2000-2004, 5: 2005-2009, 6: 2010-2014, 7: 2017-2022 )",
@@ -168,28 +180,16 @@ if question_options:
     )
     selected_question_label = question_options[selected_question_key]
 
-    filtered_data = env_data[
-        (env_data['Country'].isin(selected_countries_3)) & 
-        (env_data['Wave'].isin(selected_waves))
-    ][['Country', 'Wave', selected_question_key]].rename(columns={selected_question_key: 'mean_response'})
-
-    if not filtered_data.empty:
-        fig = px.line(
-            filtered_data,
-            x='Wave',
-            y='mean_response',
-            color='Country',
-            markers=True,
-            labels={'Wave': 'Survey Wave', 'mean_response': f''},
-            # title=f'% of Agree and Strongly Agree to "{selected_question_label}" ',
-            # color_discrete_sequence=custom_green_scale
-            color_discrete_sequence=px.colors.sequential.Viridis
-        )
+    fig = trend_figure(results_cube, selected_question_key, selected_countries_3, selected_waves)
+
+    if fig is not None:
         st.plotly_chart(fig, use_container_width=True)
     else:
         st.write(f"No data available for the selected question '{selected_question_label}' with the chosen countries and waves.")
 else:
-    st.write("No available questions found in the precomputed data.")
+    fig = selected_question_key = selected_question_label = None
+    if results_cube is not None:
+        st.write("No available questions found in the precomputed data.")
 
 st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -198,36 +198,35 @@ st.markdown("""
 ### Step 2: Youth Responses
 This section shows the percentage of youth (under 29 years old) who agreed or strongly agreed with the selected question for a single wave.
 """)
-selected_wave_single = st.selectbox(
-    "Select a Survey Wave (Only One)", 
-    options=sorted(age_data['Wave'].unique()), 
-    index=3,
-    key="wave_single_selection"
-)
 
-reverse_country_mapping = {v: k for k, v in country_mapping.items()}
-selected_countries_3 = [reverse_country_mapping.get(country, country) for country in selected_countries_names]
-
-if selected_question_key in age_data.columns:
-    filtered_age_data = age_data[
-        (age_data['Wave'] == selected_wave_single) & (age_data['Country'].isin(selected_countries_3))
-    ][['Country', selected_question_key]].rename(columns={selected_question_key: 'Percentage_Favorable'})
-
-    if not filtered_age_data.empty:
-        filtered_age_data = filtered_age_data.sort_values(by='Percentage_Favorable', ascending=False)
-        fig = px.bar(
-            filtered_age_data,
-            x='Country',
-            y='Percentage_Favorable',
-            text='Percentage_Favorable',
-            color='Percentage_Favorable',
-            color_continuous_scale=custom_green_scale,
-            labels={'Percentage_Favorable': 'Percentage Favorable (%)'}
+# Changing the wave only reruns this section; the rest of the page reruns when the
+# countries or question it is called with change
+@st.fragment
+def youth_responses(question_key, question_label, countries_3):
+    metrics.start_fragment()
+    fig = None
+    if results_cube is not None:
+        selected_wave_single = st.selectbox(
+            "Select a Survey Wave (Only One)", 
+            options=results_cube.waves(YOUTH_AGE_GROUP), 
+            index=3,
+            key="wave_single_selection"
         )
-        fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-        st.plotly_chart(fig, use_container_width=True)
-    else:
-        st.write(f"No data available for '{selected_question_label}' with the chosen countries and wave.")
+
+    # question_key is None without the results cube
+    if question_key is not None:
+        fig = youth_figure(results_cube, question_key, countries_3, selected_wave_single)
+
+        if fig is not None:
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.write(f"No data available for '{question_label}' with the chosen countries and wave.")
+    metrics.section_done('step_2', figure=fig)
+    metrics.finish_fragment()
+
+metrics.section_done('step_1', figure=fig)
+
+youth_responses(selected_question_key, selected_question_label, selected_countries_3)
 
 st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -237,27 +236,12 @@ st.markdown("""
 Compare the historical CO₂ emissions per capita (1981–2023) for the selected countries to understand their environmental impact.
 """)
 
-selected_countries_alpha = [reverse_country_mapping.get(country, country) for country in selected_countries_names]
-filtered_co2_data = co2_data[
-    (co2_data['iso_code'].isin(selected_countries_alpha)) & 
-    (co2_data['year'].between(1981, 2023))
-]
-
-if not filtered_co2_data.empty:
-    fig = px.line(
-        filtered_co2_data,
-        x='year',
-        y='co2_per_capita',
-        color='iso_code',
-        labels={'year': 'Year', 
-                'co2_per_capita': 'CO₂ Emissions Per Capita (Metric Tons)'
-                },
-        # title="CO₂ Emissions Per Capita Trends (1981–2023)",
-        color_discrete_sequence=custom_green_scale
-    )
-    # Update the layout to set the legend title
-    fig.update_layout(legend_title_text='Country')
+co2_data = load_or_warn(load_co2_data, "Step 3")
+fig = co2_figure(co2_data, selected_countries_3) if co2_data is not None else None
+
+if fig is not None:
     st.plotly_chart(fig, use_container_width=True)
+metrics.section_done('step_3_co2', figure=fig)
 
 
 
@@ -271,54 +255,12 @@ This map shows the implementation of Carbon Pricing Instruments (Carbon Tax and
 """)
 
 
-# Prepare data for visualization
-tax_data['Instrument_Type'] = tax_data.apply(
-    lambda row: "Both" if row['Carbon Tax'] > 0 and row['ETS'] > 0 
-    else "Carbon Tax" if row['Carbon Tax'] > 0 
-    else "ETS" if row['ETS'] > 0 
-    else "None", 
-    axis=1
-)
-
-# Map instruments to colors
-instrument_color_map = {
-    "None": "#ff0000",  # Strong red for None
-    "Carbon Tax": "#66bb6a",  # Light green for Carbon Tax
-    "ETS": "#006400",  # Dark green for ETS
-    "Both": "#003300",  # Very dark green for Both
-}
-
-# Create the map using Plotly
-fig_map = px.choropleth(
-    tax_data,
-    locations="ISO3",  # Country ISO3 codes
-    color="Instrument_Type",  # Color by instrument type
-    hover_name="Country",  # Display country name on hover
-    hover_data={"Carbon Tax": True, "ETS": True, "Instrument_Type": False},
-    title=" ",
-    color_discrete_map=instrument_color_map,
-    projection="natural earth"  # Use a modern map projection
-)
-
-# Customize the layout for a clean design
-fig_map.update_layout(
-    geo=dict(
-        showframe=False,
-        showcoastlines=True,
-        projection_scale=1.2,  # Adjust map zoom level
-        center={"lat": 10, "lon": 0}  # Center the map
-    ),
-    margin=dict(t=50, b=50, l=50, r=50),
-    title=dict(
-        font=dict(size=24, color="#2e7d32"),
-        x=0.5  # Center the title
-    ),
-    height=500,
-    width=1200
-)
-
 # Display the map in Streamlit
-st.plotly_chart(fig_map, use_container_width=True)
+tax_data = load_or_warn(load_tax_data, "Step 4")
+fig_map = carbon_pricing_map(tax_data) if tax_data is not None else None
+if fig_map is not None:
+    st.plotly_chart(fig_map, use_container_width=True)
+metrics.section_done('step_4_map', figure=fig_map)
 
 st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -329,60 +271,12 @@ st.markdown("""
 The Environmental Performance Index (EPI) ranks countries on their environmental health and ecosystem vitality.
 """)
 
-# Filter the data for default countries and only for the year 2024
-filtered_epi_data = epi_data[
-    (epi_data['region'].isin(default_countries_names)) & 
-    (epi_data['date'] == 2024)
-]
-
-# Add arrow indicators to the trend column
-filtered_epi_data['trend_arrow'] = filtered_epi_data['trend'].apply(
-    lambda x: "↑" if x > 0 else "↓" if x < 0 else "→"
-)
-
-# Combine trend and arrow into a single column for display
-filtered_epi_data['trend_display'] = filtered_epi_data.apply(
-    lambda row: f"{row['trend_arrow']} {abs(row['trend']):.1f}", axis=1
-)
-
-# Sort the data by value
-sorted_epi_data = filtered_epi_data.sort_values(by='value', ascending=True)
-
-# Create the barplot
-fig_epi_combined = px.bar(
-    sorted_epi_data,
-    y='region',
-    x='value',
-    orientation='h',
-    text='value',
-    color='value',
-    color_continuous_scale=custom_green_scale,
-    labels={
-        'value': 'Environmental Performance Index (EPI)', 
-        'region': 'Country',
-        'trend_display': 'Trend'
-    },
-    # title="Environmental Performance Index (EPI) for Selected Countries (2024)"
-)
-
-# Add EPI and trend data to the bar labels
-fig_epi_combined.update_traces(
-    texttemplate='EPI: %{x:.1f} Trend: %{customdata[0]}',  # Position text next to each other
-    customdata=sorted_epi_data[['trend_display']].to_numpy(),  # Pass trend_display column as customdata
-    textposition='inside',
-    textfont=dict(size=18)  # Make text larger
-)
-
-# Customize the chart
-fig_epi_combined.update_layout(
-    yaxis=dict(title="Country"),
-    xaxis=dict(title="EPI Score"),
-    margin=dict(t=50, b=50, l=100, r=50),
-    coloraxis_showscale=False  # Hide the color scale
-)
-
-# Display the chart in Streamlit
-st.plotly_chart(fig_epi_combined, use_container_width=True)
+# Display the chart for the default countries in Streamlit
+epi_data = load_or_warn(load_epi_data, "Step 5")
+fig_epi_combined = epi_figure(epi_data, default_countries_codes) if epi_data is not None else None
+if fig_epi_combined is not None:
+    st.plotly_chart(fig_epi_combined, use_container_width=True)
+metrics.section_done('step_5_epi', figure=fig_epi_combined)
 
 st.markdown("<hr>", unsafe_allow_html=True)
 
@@ -432,3 +326,5 @@ Jaronimas Snipas
 [GitHub](https://github.com/jaronimas-codes) | 
 [LinkedIn](https://www.linkedin.com/in/jaronimas-snipas/)
 """)
+metrics.section_done('footer')
+metrics.finish_run()
@@ -0,0 +1,160 @@
+import argparse
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+from benchmarks.bench_suite import prepare_app_dir
+from benchmarks.load_test import free_port, percentiles
+
+# Drive `python api.py` with concurrent clients, each on one keep-alive connection sending
+# random queries of every endpoint. A share of the requests repeat a query the client has
+# already fetched with its ETag in If-None-Match, as a polling dashboard would, and all
+# accept gzip. Reports requests per second and p50/p95/p99 latency, for comparison with the
+# reruns per second of benchmarks/load_test.py against the Streamlit app.
+# Run from the repository root: python -m benchmarks.api_load_test --clients 20 --seconds 10
+
+DEFAULT_COUNTRIES = ['AUS', 'CAN', 'CHN', 'RUS', 'DEU', 'CHE', 'USA']
+MAX_COUNTRIES = 15
+
+
+def start_api(app_dir, port):
+    command = [sys.executable, 'api.py', '--port', str(port)]
+    server = subprocess.Popen(command, cwd=app_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('localhost', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("API server did not start")
+
+
+def random_query(rng, questions, country_codes, waves):
+    """A path and query string of a random endpoint with a random selection."""
+    selected = ','.join(rng.sample(country_codes, rng.randint(1, min(MAX_COUNTRIES, len(country_codes)))))
+    endpoint = rng.choice(['trend', 'youth', 'co2', 'carbon-pricing', 'epi'])
+    if endpoint == 'trend':
+        chosen_waves = sorted(rng.sample(waves, rng.randint(1, len(waves))))
+        params = {'question': rng.choice(questions), 'countries': selected,
+                  'waves': ','.join(map(str, chosen_waves))}
+    elif endpoint == 'youth':
+        params = {'question': rng.choice(questions), 'countries': selected, 'wave': rng.choice(waves)}
+    elif endpoint == 'co2':
+        params = {'countries': selected, 'from': rng.randint(1981, 2010)}
+    else:
+        params = {'countries': selected}
+    return f'/{endpoint}?{urlencode(params)}'
+
+
+def client(port, seconds, revalidate, seed, questions, country_codes, waves, results, lock):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection('localhost', port)
+    etags = {}  # Query -> ETag of the last 200
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if etags and rng.random() < revalidate:
+            path = rng.choice(sorted(etags))
+            headers = {'Accept-Encoding': 'gzip', 'If-None-Match': etags[path]}
+        else:
+            path = random_query(rng, questions, country_codes, waves)
+            headers = {'Accept-Encoding': 'gzip'}
+        start = time.perf_counter()
+        connection.request('GET', path, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+        if response.status == 200:
+            etags[path] = response.getheader('ETag')
+    connection.close()
+    with lock:
+        results['latencies'] += latencies
+        for status, count in statuses.items():
+            results['statuses'][status] = results['statuses'].get(status, 0) + count
+
+
+def load_test(port, clients, seconds, revalidate):
+    # The selections a client picks from, as the API lists them
+    connection = http.client.HTTPConnection('localhost', port)
+    connection.request('GET', '/')
+    questions = sorted(json.loads(connection.getresponse().read())['questions'])
+    connection.request('GET', '/trend?' + urlencode({'question': questions[0]}))
+    results = json.loads(connection.getresponse().read())['results']
+    connection.close()
+    country_codes = sorted({result['country'] for result in results} | set(DEFAULT_COUNTRIES))
+    waves = sorted({result['wave'] for result in results})
+
+    results = {'latencies': [], 'statuses': {}}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=client, args=(port, seconds, revalidate, i, questions, country_codes,
+                                                     waves, results, lock))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    return {
+        'clients': clients,
+        'seconds': elapsed,
+        'requests_per_second': len(results['latencies']) / elapsed,
+        'latency': percentiles(results['latencies']),
+        'statuses': {str(status): count for status, count in sorted(results['statuses'].items())},
+    }
+
+
+def print_summary(summary):
+    latency = summary['latency']
+    print(f"{summary['clients']} clients, {latency['count']} requests in {summary['seconds']:.1f}s "
+          f"({summary['requests_per_second']:.0f} requests/s)")
+    print(f"latency: p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, "
+          f"p99 {latency['p99_ms']:.2f} ms, max {latency['max_ms']:.2f} ms")
+    print("responses: " + ', '.join(f"{count} x {status}" for status, count in summary['statuses'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test api.py with concurrent keep-alive clients.")
+    parser.add_argument('--clients', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--revalidate', type=float, default=0.5,
+                        help="Share of requests that repeat a fetched query with If-None-Match")
+    parser.add_argument('--precalculated-dir', help="Serve these precomputed files instead of precalculated_data/")
+    parser.add_argument('--port', type=int, help="Use the API server already running on this port")
+    parser.add_argument('--output', help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        if args.port:
+            port = args.port
+        else:
+            if prepare_app_dir(workdir, args.precalculated_dir):
+                print("Using a generated CO₂ file: data/co2-data.csv is missing")
+            port = free_port()
+            server = start_api(workdir, port)
+        try:
+            summary = load_test(port, args.clients, args.seconds, args.revalidate)
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
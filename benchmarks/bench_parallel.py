@@ -0,0 +1,39 @@
+import argparse
+import os
+import time
+
+from mappings.variable_mappings_env import variable_mappings
+from scripts.aggregation import merge_counts, partial_counts
+from scripts.ingest import cache_is_fresh
+from scripts.manifest import count_key_columns
+from scripts.parallel import sharded_aggregate
+
+# Time the env/youth aggregation over data/data.csv (or its Parquet cache) with 1 to N worker processes.
+# Run from the repository root: python -m benchmarks.bench_parallel --max-workers 8
+
+env_vars = [list(item.keys())[0] for item in variable_mappings]
+
+
+def time_run(workers, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        sharded_aggregate(count_key_columns(), env_vars, partial_counts, merge_counts, workers=workers)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the precompute aggregation from 1 to N workers.")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per worker count; the best time is kept")
+    args = parser.parse_args()
+
+    print(f"Source: {'Parquet cache' if cache_is_fresh() else 'CSV (read in one process whatever the workers)'}, "
+          f"{os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8}")
+    serial = None
+    for workers in range(1, args.max_workers + 1):
+        seconds = time_run(workers, args.repeat)
+        serial = serial or seconds
+        print(f"{workers:>8} {seconds:>9.2f} {serial / seconds:>7.2f}x")
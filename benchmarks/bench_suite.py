@@ -0,0 +1,291 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import runpy
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# Wall time and peak memory of the precompute scripts on synthetic WVS-shaped inputs of
+# increasing size, of each section of app.py on its first render (through AppTest) with the
+# size of the figure JSON it sends, and of the charts with every country selected.
+# Every measurement runs in a fresh process. Results are written as JSON and compared with a
+# saved baseline:
+#   python -m benchmarks.bench_suite --output bench.json --baseline benchmarks/baseline.json
+#   python -m benchmarks.bench_suite --save-baseline benchmarks/baseline.json
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = [50_000, 200_000, 800_000]
+
+# Run in this order, as scripts.build would: the age step reuses the counts of the env step
+PRECOMPUTE_MODULES = [
+    'scripts.convert_to_parquet',
+    'scripts.precompute_env_data',
+    'scripts.precomputed_age_data',
+    'scripts.min_max_columns',
+    'scripts.precompute_confidence_intervals',
+    'scripts.precompute_results_cube',
+]
+
+# What app.py needs to run, copied next to the precomputed files
+APP_FILES = ['app.py', 'api.py', 'dashboard', 'mappings', 'img', 'static', '.streamlit']
+CO2_PATH = 'precalculated_data/co2_per_capita.parquet'
+CO2_OTHER_COLUMNS = 75  # The Our World in Data file has about 80 columns
+CO2_REGIONS = {'World': '', 'Africa': '', 'High-income countries': '', 'International transport': 'OWID_ITR'}
+
+
+def write_co2_csv(path, seed=0):
+    """A stand-in for the Our World in Data CO₂ file: every WVS country and some regions from 1750 to 2023."""
+    import numpy as np
+    import pandas as pd
+    from mappings.country_mapping import country_info
+
+    rng = np.random.default_rng(seed)
+    years = np.arange(1750, 2024)
+    countries = [(info['country_name'], info['country_3']) for info in country_info] + list(CO2_REGIONS.items())
+    data = pd.DataFrame({
+        'country': np.repeat([name for name, _ in countries], len(years)),
+        'year': np.tile(years, len(countries)),
+        'iso_code': np.repeat([code for _, code in countries], len(years)),
+        'co2_per_capita': rng.uniform(0.1, 20, len(countries) * len(years)).round(3),
+    })
+    for i in range(CO2_OTHER_COLUMNS):
+        data[f'indicator_{i}'] = rng.uniform(0, 1000, len(data)).round(3)
+    data.sort_values(['country', 'year']).to_csv(path, index=False)
+
+
+def peak_rss_mb():
+    # Peak of this process plus its largest worker process. On Linux ru_maxrss survives exec,
+    # so it would report the benchmark runner's own peak; VmHWM is reset for the new program.
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if os.path.exists('/proc/self/status'):
+        with open('/proc/self/status') as f:
+            own = next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+        return (own + children) / 1024
+    # ru_maxrss is in bytes on macOS
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + children) / (1024 * 1024)
+
+
+def measure_module(module):
+    # Runs inside the measured process
+    sys.argv = [module]
+    start = time.perf_counter()
+    runpy.run_module(module, run_name='__main__')
+    return {'seconds': time.perf_counter() - start, 'peak_rss_mb': peak_rss_mb()}
+
+
+def measure_app():
+    # Runs inside the measured process; WVS_STARTUP_PROFILE makes app.py time its sections
+    # and WVS_METRICS_LOG makes it record their figure sizes
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    at = AppTest.from_file('app.py', default_timeout=300).run()
+    seconds = time.perf_counter() - start
+    from dashboard import metrics, profiling
+    payload = {name: totals['payload_bytes'] for name, totals in metrics.section_totals().items()
+               if totals['payload_bytes']}
+    return {'seconds': seconds, 'peak_rss_mb': peak_rss_mb(), 'sections': profiling.report()['sections'],
+            'payload_bytes': payload, 'errors': [str(error.value) for error in at.exception]}
+
+
+def measure_charts():
+    # Runs inside the measured process: the Step 1 and Step 3 charts with every country
+    # selected, built without the figure cache. 'render' is building the figure plus turning
+    # it into the JSON Streamlit sends; the time the browser takes to draw it is not measured.
+    import pandas as pd
+    import plotly.io as pio
+    from dashboard.cube import ResultsCube
+    from dashboard.figures import co2_figure, trend_figure
+
+    cube = ResultsCube.load()
+    co2_data = pd.read_parquet(CO2_PATH)
+    charts = {
+        'step_1_all_countries': lambda: trend_figure.__wrapped__(cube, cube.variables()[0], cube.countries(),
+                                                                 cube.waves()),
+        'step_3_all_countries': lambda: co2_figure.__wrapped__(co2_data, list(co2_data['iso_code'].unique())),
+    }
+    results = {}
+    for name, build in charts.items():
+        build()  # Imports and first-call costs are not part of the measurement
+        start = time.perf_counter()
+        spec = pio.to_json(build(), validate=False)
+        seconds = time.perf_counter() - start
+        traces = json.loads(spec)['data']
+        results[name] = {'render_seconds': seconds, 'payload_bytes': len(spec), 'traces': len(traces),
+                         'trace_type': traces[0]['type']}
+    return results
+
+
+def run_child(cwd, *args):
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, WVS_STARTUP_PROFILE='1', WVS_METRICS_LOG='1')
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.bench_suite', *args],
+                            cwd=cwd, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{result.stderr[-3000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def bench_precompute(sizes, repeat):
+    """Median over `repeat` runs of the whole chain, each from scratch on the same generated input."""
+    # Imported here: the measured processes run this module too and must start without pandas
+    from scripts.generate_synthetic_wvs import generate, respondents_for
+
+    results = {}
+    with tempfile.TemporaryDirectory() as inputs:
+        for rows in sizes:
+            csv_path = os.path.join(inputs, f'data_{rows}.csv')
+            generate(csv_path, respondents=respondents_for(rows))
+            runs = []
+            for _ in range(repeat):
+                with tempfile.TemporaryDirectory() as workdir:
+                    os.makedirs(os.path.join(workdir, 'data'))
+                    os.makedirs(os.path.join(workdir, 'precalculated_data'))
+                    shutil.copy(csv_path, os.path.join(workdir, 'data', 'data.csv'))
+                    runs.append({module: run_child(workdir, '--child-module', module) for module in PRECOMPUTE_MODULES})
+            results[str(rows)] = {
+                module: {key: statistics.median(run[module][key] for run in runs) for key in runs[0][module]}
+                for module in PRECOMPUTE_MODULES
+            }
+            for module, result in results[str(rows)].items():
+                print(f"  {rows:>9,} rows  {module:<42} {result['seconds']:>7.2f}s {result['peak_rss_mb']:>7.0f} MB")
+    return results
+
+
+def prepare_app_dir(workdir, precalculated_dir=None):
+    """Copy app.py, api.py and what they read into `workdir`; returns True when a generated CO₂ file had to be added."""
+    for name in APP_FILES:
+        source = os.path.join(REPO_ROOT, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, name))
+        elif os.path.exists(source):
+            shutil.copy(source, workdir)
+    shutil.copytree(precalculated_dir or os.path.join(REPO_ROOT, 'precalculated_data'),
+                    os.path.join(workdir, 'precalculated_data'))
+    if os.path.exists(os.path.join(workdir, CO2_PATH)):
+        return False
+    from scripts.precompute_co2_data import SOURCE_PATHS, build
+
+    source = next((os.path.join(REPO_ROOT, path) for path in SOURCE_PATHS
+                   if os.path.exists(os.path.join(REPO_ROOT, path))), None)
+    synthetic_co2 = source is None
+    if synthetic_co2:
+        source = os.path.join(workdir, 'co2-data.csv')
+        write_co2_csv(source)
+    build(source, os.path.join(workdir, CO2_PATH))
+    return synthetic_co2
+
+
+def bench_app(repeat):
+    """Median over `repeat` cold runs of app.py on the repository's precomputed files."""
+    with tempfile.TemporaryDirectory() as workdir:
+        synthetic_co2 = prepare_app_dir(workdir)
+        runs = [run_child(workdir, '--child-app') for _ in range(repeat)]
+        chart_runs = [run_child(workdir, '--child-charts') for _ in range(repeat)]
+    errors = sorted({error for run in runs for error in run['errors']})
+    sections = {name: statistics.median(run['sections'].get(name, float('nan')) for run in runs)
+                for name in runs[0]['sections']}
+    # Figures are the same on every run
+    payload = runs[0]['payload_bytes']
+    charts = {name: {'render_seconds': statistics.median(run[name]['render_seconds'] for run in chart_runs),
+                     **{key: value for key, value in chart_runs[0][name].items() if key != 'render_seconds'}}
+              for name in chart_runs[0]}
+    for name, seconds in sections.items():
+        size = f"{payload[name] / 1024:>7.1f} KB" if name in payload else ''
+        print(f"  {name:<42} {seconds:>7.3f}s {size}")
+    for name, chart in charts.items():
+        print(f"  {name:<42} {chart['render_seconds']:>7.3f}s {chart['payload_bytes'] / 1024:>7.1f} KB "
+              f"({chart['traces']} {chart['trace_type']} traces)")
+    for error in errors:
+        print(f"  [error] {error}")
+    return {
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'peak_rss_mb': max(run['peak_rss_mb'] for run in runs),
+        'sections': sections,
+        'payload_bytes': payload,
+        'charts': charts,
+        'synthetic_co2': synthetic_co2,
+        'errors': errors,
+    }
+
+
+def flatten(results, prefix=''):
+    """{'a': {'b': 1.0}} -> {'a/b': 1.0}, numbers only."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f'{prefix}{key}/'))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f'{prefix}{key}'] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    """Print each time and memory figure next to the baseline; return those slower than `threshold` x baseline."""
+    current, previous = flatten(results['measurements']), flatten(baseline['measurements'])
+    regressions = []
+    print(f"\n{'measurement':<72} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, value in current.items():
+        if name not in previous or not previous[name]:
+            continue
+        ratio = value / previous[name]
+        print(f"{name:<72} {previous[name]:>10.3f} {value:>10.3f} {ratio:>7.2f}x")
+        if name.endswith('seconds') and ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the precompute scripts and the app render path.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Generated input sizes in rows")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the median is kept")
+    parser.add_argument('--skip-precompute', action='store_true')
+    parser.add_argument('--skip-app', action='store_true')
+    parser.add_argument('--output', help="Write the results to this JSON file")
+    parser.add_argument('--baseline', help="Compare with the results in this JSON file")
+    parser.add_argument('--save-baseline', help="Write the results to this JSON file as the new baseline")
+    parser.add_argument('--max-slowdown', type=float, default=None,
+                        help="Exit 1 when a time is more than this many times its baseline (e.g. 1.25)")
+    parser.add_argument('--child-module', help=argparse.SUPPRESS)
+    parser.add_argument('--child-app', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--child-charts', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # Measured processes print one JSON line as their last line of output
+    if args.child_module:
+        print(json.dumps(measure_module(args.child_module)))
+        return
+    if args.child_app or args.child_charts:
+        print(json.dumps(measure_app() if args.child_app else measure_charts()))
+        return
+
+    results = {
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'measurements': {},
+    }
+    if not args.skip_precompute:
+        print("Precompute scripts")
+        results['measurements']['precompute'] = bench_precompute(args.sizes, args.repeat)
+    if not args.skip_app:
+        print("App sections (first render)")
+        results['measurements']['app'] = bench_app(args.repeat)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f:
+                json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.max_slowdown or float('inf'))
+        if args.max_slowdown and regressions:
+            print(f"\n{len(regressions)} measurements slower than {args.max_slowdown}x the baseline")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import tempfile
+import timeit
+
+import pandas as pd
+from benchmarks.bench_suite import write_co2_csv
+from dashboard.cube import CUBE_PATH, YOUTH_AGE_GROUP, ResultsCube
+from dashboard.datasets import DEFAULT_COUNTRIES, EPI_PATH, TAX_PATH
+from dashboard.schema import EPI_DTYPES, TAX_DTYPES, read_csv
+from mappings.country_registry import countries
+from scripts.precompute_co2_data import build as build_co2
+from scripts.precompute_co2_data import source_path as co2_source_path
+
+# Load time and memory of each dataset app.py loads, read by pandas' defaults from the
+# source file and as the app reads it (with the dtypes of dashboard/schema.py, or from the
+# pruned CO₂ table of scripts/precompute_co2_data.py), and the time of each step's filter on both.
+# Run from the repository root: python -m benchmarks.dtype_report
+
+REPEAT = 200
+
+
+def megabytes(data):
+    return data.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def best_ms(function):
+    """Fastest of REPEAT calls, in milliseconds."""
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1000
+
+
+def step_filters(co2_data, epi_data, cube):
+    """The filter each step runs on a rerun with the default selection."""
+    waves = cube.waves()
+    return {
+        'step_1_trend': lambda: cube.query('B008', DEFAULT_COUNTRIES, waves),
+        'step_2_youth': lambda: cube.query('B008', DEFAULT_COUNTRIES, [waves[-1]], YOUTH_AGE_GROUP),
+        'step_3_co2': lambda: co2_data[co2_data['iso_code'].isin(DEFAULT_COUNTRIES) &
+                                       co2_data['year'].between(1981, 2023)],
+        'step_5_epi': lambda: epi_data[epi_data['ISO3'].isin(DEFAULT_COUNTRIES) & (epi_data['date'] == 2024)],
+    }
+
+
+def timed(load):
+    start = timeit.default_timer()
+    data = load()
+    return data, (timeit.default_timer() - start) * 1000
+
+
+def report(co2_source, co2_table):
+    loads = {
+        'co2': (lambda: pd.read_csv(co2_source), lambda: pd.read_parquet(co2_table)),
+        'tax': (lambda: pd.read_csv(TAX_PATH), lambda: read_csv(TAX_PATH, TAX_DTYPES)),
+        'epi': (lambda: pd.read_csv(EPI_PATH, delimiter=';'), lambda: read_csv(EPI_PATH, EPI_DTYPES, delimiter=';')),
+    }
+    result = {'load_ms': {}, 'memory_mb': {}, 'filter_ms': {}}
+    default, compact = {}, {}
+    for name, (load_default, load_compact) in loads.items():
+        default[name], default_ms = timed(load_default)
+        compact[name], compact_ms = timed(load_compact)
+        result['load_ms'][name] = {'default': default_ms, 'compact': compact_ms}
+
+    # As app.py joins them, on ISO3
+    for frames in (default, compact):
+        frames['epi'] = frames['epi'].assign(ISO3=countries.to_iso3(frames['epi']['regionCode']))
+
+    # The cube's compact dtypes come from the precompute script; the default is what a CSV would give
+    cube_data = pd.read_parquet(CUBE_PATH)
+    default['results_cube'] = cube_data.astype({'Variable': 'object', 'Country': 'object',
+                                                'Wave': 'int64', 'Age_Group': 'int64'})
+    compact['results_cube'] = cube_data
+
+    for name in default:
+        result['memory_mb'][name] = {'default': megabytes(default[name]), 'compact': megabytes(compact[name])}
+
+    timings = {kind: step_filters(frames['co2'], frames['epi'], ResultsCube(frames['results_cube']))
+               for kind, frames in (('default', default), ('compact', compact))}
+    for step in timings['default']:
+        result['filter_ms'][step] = {kind: best_ms(timings[kind][step]) for kind in timings}
+    return result
+
+
+def print_report(result):
+    print(f"{'load (ms)':<16} {'default':>10} {'compact':>10} {'speedup':>8}")
+    for name, times in result['load_ms'].items():
+        print(f"{name:<16} {times['default']:>10.1f} {times['compact']:>10.1f} "
+              f"{times['default'] / times['compact']:>7.1f}x")
+    print(f"\n{'memory (MB)':<16} {'default':>10} {'compact':>10} {'saved':>8}")
+    for name, sizes in result['memory_mb'].items():
+        print(f"{name:<16} {sizes['default']:>10.3f} {sizes['compact']:>10.3f} "
+              f"{1 - sizes['compact'] / sizes['default']:>7.0%}")
+    print(f"\n{'filter (ms)':<16} {'default':>10} {'compact':>10} {'speedup':>8}")
+    for step, times in result['filter_ms'].items():
+        print(f"{step:<16} {times['default']:>10.3f} {times['compact']:>10.3f} "
+              f"{times['default'] / times['compact']:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare default and declared dtypes of the app's datasets.")
+    parser.add_argument('--output', help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        co2_source = co2_source_path()
+        if co2_source is None:
+            print("Using a generated CO₂ file: data/co2-data.csv is missing\n")
+            co2_source = os.path.join(tmp, 'co2-data.csv')
+            write_co2_csv(co2_source)
+        co2_table = os.path.join(tmp, 'co2_per_capita.parquet')
+        build_co2(co2_source, co2_table)
+        result = report(co2_source, co2_table)
+
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import psutil
+from benchmarks.bench_suite import prepare_app_dir
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ClientState_pb2 import ClientState
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.websocket import websocket_connect
+
+# Drive many concurrent simulated browser sessions against `streamlit run app.py`. Each session
+# loads the page, then reruns it with random selections (countries, waves, question, Step 2 wave)
+# the way the browser does, over Streamlit's websocket protocol. Reports p50/p95/p99 latency of
+# the first load and of the reruns, and the server's resident memory.
+# Run from the repository root: python -m benchmarks.load_test --sessions 20 --reruns 10
+
+# Labels of the widgets a session changes, and the action that changes each
+WIDGETS = {
+    'countries': "Select countries",
+    'waves': "Select survey waves",
+    'question': "Select a question to visualize",
+    'youth_wave': "Select a Survey Wave (Only One)",
+}
+MAX_COUNTRIES = 15
+MEMORY_SAMPLE_SECONDS = 0.25
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_dir, port):
+    command = [sys.executable, '-m', 'streamlit', 'run', 'app.py', '--server.headless', 'true',
+               '--server.port', str(port), '--browser.gatherUsageStats', 'false']
+    server = subprocess.Popen(command, cwd=app_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('localhost', port), timeout=1).close()
+            return server
+        except OSError:
+            time.sleep(0.25)
+    server.kill()
+    raise RuntimeError("Streamlit server did not start")
+
+
+class Session:
+    """One simulated browser tab: keeps the current widget values and sends them with every rerun."""
+
+    def __init__(self, url, rng):
+        self.url = url
+        self.rng = rng
+        self.widgets = {}  # action -> widget id, number of options and fragment id
+        self.values = {}  # action -> current value
+        self.errors = 0
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.url, max_message_size=256 << 20)
+
+    async def run(self, fragment_id=''):
+        state = ClientState()
+        for action, widget in self.widgets.items():
+            widget_state = state.widget_states.widgets.add()
+            widget_state.id = widget['id']
+            if isinstance(self.values[action], list):
+                widget_state.int_array_value.data.extend(self.values[action])
+            else:
+                widget_state.int_value = self.values[action]
+        state.fragment_id = fragment_id
+        message = BackMsg()
+        message.rerun_script.CopyFrom(state)
+
+        start = time.perf_counter()
+        await self.ws.write_message(message.SerializeToString(), binary=True)
+        while True:
+            raw = await self.ws.read_message()
+            if raw is None:
+                raise RuntimeError("Server closed the connection")
+            forward = ForwardMsg()
+            forward.ParseFromString(raw)
+            kind = forward.WhichOneof('type')
+            if kind == 'delta':
+                self._record(forward)
+            elif kind == 'script_finished':
+                return time.perf_counter() - start
+
+    def _record(self, forward):
+        element = forward.delta.new_element
+        kind = element.WhichOneof('type')
+        if kind == 'exception':
+            self.errors += 1
+        if kind not in ('multiselect', 'selectbox'):
+            return
+        widget = getattr(element, kind)
+        for action, label in WIDGETS.items():
+            if widget.label.startswith(label) and action not in self.widgets:
+                self.widgets[action] = {'id': widget.id, 'options': len(widget.options),
+                                        'fragment_id': forward.delta.fragment_id}
+                self.values[action] = list(widget.default) if kind == 'multiselect' else widget.default
+
+    def change_something(self):
+        """Pick a widget and a new random value for it; returns the action and the fragment to rerun."""
+        action = self.rng.choice(sorted(self.widgets))
+        options = range(self.widgets[action]['options'])
+        if action == 'countries':
+            self.values[action] = sorted(self.rng.sample(options, self.rng.randint(1, min(MAX_COUNTRIES, len(options)))))
+        elif action == 'waves':
+            self.values[action] = sorted(self.rng.sample(options, self.rng.randint(1, len(options))))
+        else:
+            self.values[action] = self.rng.choice(options)
+        return action, self.widgets[action]['fragment_id']
+
+
+async def simulate(url, reruns, think_seconds, seed, results):
+    session = Session(url, random.Random(seed))
+    await session.connect()
+    try:
+        results['first_load'].append(await session.run())
+        for _ in range(reruns):
+            await asyncio.sleep(session.rng.uniform(0, think_seconds))
+            action, fragment_id = session.change_something()
+            results['reruns'].setdefault(action, []).append(await session.run(fragment_id))
+    finally:
+        results['errors'] += session.errors
+        session.ws.close()
+
+
+async def sample_memory(process, samples, stop):
+    while not stop.is_set():
+        samples.append(process.memory_info().rss / (1024 * 1024))
+        try:
+            await asyncio.wait_for(stop.wait(), MEMORY_SAMPLE_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def load_test(port, sessions, reruns, think_seconds, ramp_seconds, server_pid):
+    url = f'ws://localhost:{port}/_stcore/stream'
+    results = {'first_load': [], 'reruns': {}, 'errors': 0}
+    samples, stop = [], asyncio.Event()
+    memory = asyncio.create_task(sample_memory(psutil.Process(server_pid), samples, stop)) if server_pid else None
+
+    async def start(i):
+        await asyncio.sleep(ramp_seconds * i / max(sessions, 1))
+        await simulate(url, reruns, think_seconds, i, results)
+
+    start_time = time.perf_counter()
+    await asyncio.gather(*(start(i) for i in range(sessions)))
+    results['seconds'] = time.perf_counter() - start_time
+    if memory:
+        stop.set()
+        await memory
+        results['server_rss_mb'] = {'start': samples[0], 'peak': max(samples), 'end': samples[-1]}
+    return results
+
+
+def percentiles(latencies):
+    if not latencies:
+        return {}
+    ordered = sorted(latencies)
+
+    def at(share):
+        return ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+    return {'count': len(ordered), 'p50_ms': statistics.median(ordered) * 1000, 'p95_ms': at(0.95),
+            'p99_ms': at(0.99), 'max_ms': ordered[-1] * 1000}
+
+
+def summarize(results, sessions):
+    all_reruns = [latency for latencies in results['reruns'].values() for latency in latencies]
+    summary = {
+        'sessions': sessions,
+        'seconds': results['seconds'],
+        'reruns_per_second': len(all_reruns) / results['seconds'],
+        'first_load': percentiles(results['first_load']),
+        'reruns': percentiles(all_reruns),
+        'reruns_by_action': {action: percentiles(latencies) for action, latencies in sorted(results['reruns'].items())},
+        'errors': results['errors'],
+    }
+    if 'server_rss_mb' in results:
+        summary['server_rss_mb'] = results['server_rss_mb']
+    return summary
+
+
+def print_summary(summary):
+    print(f"{summary['sessions']} sessions, {summary['reruns']['count'] if summary['reruns'] else 0} reruns "
+          f"in {summary['seconds']:.1f}s ({summary['reruns_per_second']:.1f} reruns/s), {summary['errors']} app errors")
+    rows = [('first load', summary['first_load']), ('all reruns', summary['reruns'])]
+    rows += [(f'  {action}', stats) for action, stats in summary['reruns_by_action'].items()]
+    print(f"{'':<14} {'count':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, stats in rows:
+        if stats:
+            print(f"{name:<14} {stats['count']:>6} {stats['p50_ms']:>8.0f} {stats['p95_ms']:>8.0f} "
+                  f"{stats['p99_ms']:>8.0f} {stats['max_ms']:>8.0f}")
+    if 'server_rss_mb' in summary:
+        memory = summary['server_rss_mb']
+        print(f"server RSS: {memory['start']:.0f} MB at start, {memory['peak']:.0f} MB peak, {memory['end']:.0f} MB at end")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test app.py with concurrent simulated sessions.")
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--reruns', type=int, default=10, help="Reruns per session after the first load")
+    parser.add_argument('--think', type=float, default=0.5, help="Maximum pause between a session's reruns (s)")
+    parser.add_argument('--ramp', type=float, default=2.0, help="Seconds over which the sessions start")
+    parser.add_argument('--precalculated-dir', help="Serve these precomputed files instead of precalculated_data/")
+    parser.add_argument('--port', type=int, help="Use the server already running on this port")
+    parser.add_argument('--server-pid', type=int, help="Process to sample memory of, with --port")
+    parser.add_argument('--output', help="Write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        if args.port:
+            port, server_pid = args.port, args.server_pid
+        else:
+            # Serve a copy, with a generated CO₂ file if the real one is missing
+            if prepare_app_dir(workdir, args.precalculated_dir):
+                print("Using a generated CO₂ file: data/co2-data.csv is missing")
+            port = free_port()
+            server = start_server(workdir, port)
+            server_pid = server.pid
+        try:
+            results = asyncio.run(load_test(port, args.sessions, args.reruns, args.think, args.ramp, server_pid))
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    summary = summarize(results, args.sessions)
+    print_summary(summary)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
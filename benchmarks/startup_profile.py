@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Profile a cold start of app.py: a fresh Python process imports Streamlit and runs the app
+# once headless (streamlit.testing AppTest) with WVS_STARTUP_PROFILE set. Reports the import
+# time of each top-level package, each load_* function and each section's first render, and
+# with --budget exits 1 when a time exceeds benchmarks/startup_budget.json or a module listed
+# there is already imported when the header is drawn.
+# Run from the repository root: python -m benchmarks.startup_profile --budget
+
+BUDGET_PATH = 'benchmarks/startup_budget.json'
+MIN_IMPORT_MS = 10  # Smaller imports are left out of the report
+
+
+def parse_importtime(stderr):
+    """Cumulative milliseconds of each top-level import from `python -X importtime` output."""
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        if name[1:2] == ' ':
+            continue
+        if int(cumulative) >= MIN_IMPORT_MS * 1000:
+            imports[name.strip()] = int(cumulative) / 1e6
+    return imports
+
+
+def profile_child(output_path):
+    # Runs inside the profiled process; dashboard.profiling is imported (and enabled) by app.py
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file('app.py', default_timeout=300).run()
+    from dashboard import profiling
+    result = profiling.report()
+    result['errors'] = [str(error.value) for error in at.exception]
+    result['modules_at_header'] = profiling.modules_after.get('header', [])
+    with open(output_path, 'w') as f:
+        json.dump(result, f)
+
+
+def profile():
+    with tempfile.TemporaryDirectory() as tmp:
+        output_path = os.path.join(tmp, 'profile.json')
+        env = dict(os.environ, WVS_STARTUP_PROFILE='1')
+        child = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-m', 'benchmarks.startup_profile', '--child', output_path],
+            env=env, capture_output=True, text=True
+        )
+        if child.returncode != 0:
+            raise RuntimeError(f"Profiling run failed:\n{child.stderr[-3000:]}")
+        with open(output_path) as f:
+            result = json.load(f)
+    result['imports'] = parse_importtime(child.stderr)
+    return result
+
+
+def check_budget(result, budget):
+    """Messages for every budget the profile exceeds."""
+    failures = [f"app raised: {error}" for error in result['errors']]
+    for kind in ('imports', 'loads', 'sections'):
+        for name, limit in budget.get(kind, {}).items():
+            seconds = result[kind].get(name)
+            if seconds is None and kind != 'imports':
+                failures.append(f"{kind[:-1]} {name} did not run")
+            elif seconds is not None and seconds > limit:
+                failures.append(f"{kind[:-1]} {name}: {seconds:.3f}s > {limit}s")
+    total = sum(result['sections'].values())
+    if total > budget['total_seconds']:
+        failures.append(f"first run: {total:.3f}s > {budget['total_seconds']}s")
+    for module in budget.get('deferred_modules', []):
+        if module in result['modules_at_header']:
+            failures.append(f"{module} is imported before the header is drawn")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile the cold start of app.py.")
+    parser.add_argument('--budget', nargs='?', const=BUDGET_PATH, help="Fail when over this budget file")
+    parser.add_argument('--output', help="Write the profile as JSON to this file")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        profile_child(args.child)
+        return
+
+    result = profile()
+    for kind in ('imports', 'loads', 'sections'):
+        print(kind)
+        for name, seconds in sorted(result[kind].items(), key=lambda item: -item[1] if kind == 'imports' else 0):
+            print(f"  {name:<40} {seconds * 1000:>8.0f} ms")
+    print(f"first run total {sum(result['sections'].values()) * 1000:.0f} ms")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({key: value for key, value in result.items() if key != 'modules_at_header'}, f, indent=2)
+
+    if args.budget:
+        with open(args.budget) as f:
+            failures = check_budget(result, json.load(f))
+        for failure in failures:
+            print(f"[over budget] {failure}")
+        sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+import os
+
+# Header photo and the resized copies made by scripts/build_header_images.py. They live in
+# static/, which Streamlit serves at app/static/ when server.enableStaticServing is on.
+HEADER_SOURCE = 'img/no_planet_b.jpg'
+HEADER_DIR = 'static/header'
+HEADER_NAME = 'no_planet_b'
+HEADER_ALT = 'No Planet B'
+
+# Widths of the copies: phones, the 61rem content column, and that column on 1.5x screens
+# (also Streamlit's own maximum image width)
+HEADER_WIDTHS = (480, 960, 1460)
+HEADER_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+# Width the image is shown at: full viewport below the 65rem page width, else the content column
+HEADER_SIZES = '(max-width: 65rem) 100vw, 61rem'
+
+
+def header_variant(width, extension):
+    """Path of the `width` pixels wide copy of the header image."""
+    return os.path.join(HEADER_DIR, f'{HEADER_NAME}-{width}.{extension}')
+
+
+def header_variants():
+    return [header_variant(width, extension) for width in HEADER_WIDTHS for extension in HEADER_FORMATS]
+
+
+def header_html():
+    """<picture> letting the browser pick the WebP (or JPEG) copy that fits its screen."""
+    def srcset(extension):
+        return ', '.join(f'app/{header_variant(width, extension)} {width}w' for width in HEADER_WIDTHS)
+
+    return (
+        '<picture>'
+        f'<source type="image/webp" srcset="{srcset("webp")}" sizes="{HEADER_SIZES}">'
+        f'<img src="app/{header_variant(HEADER_WIDTHS[1], "jpg")}" srcset="{srcset("jpg")}" '
+        f'sizes="{HEADER_SIZES}" alt="{HEADER_ALT}" style="width: 100%; height: auto;">'
+        '</picture>'
+    )
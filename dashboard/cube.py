@@ -0,0 +1,50 @@
+from itertools import product
+
+# Long-format results written by scripts/precompute_results_cube.py
+CUBE_PATH = 'precalculated_data/results_cube.parquet'
+CUBE_INDEX = ['Variable', 'Country', 'Wave', 'Age_Group']
+RESULT_COLUMNS = ['Country', 'Wave', 'Percentage_Favorable', 'CI_Low', 'CI_High']
+
+# Age_Group values of the cube: all respondents, or the X003R2 code of the youth group
+ALL_AGES = 0
+YOUTH_AGE_GROUP = 1  # Under 29
+
+
+class ResultsCube:
+    """
+    Percentages favorable keyed by (Variable, Country, Wave, Age_Group).
+
+    The table is kept sorted by that key together with a hash index from key to row, so a
+    selection is answered by looking up its countries x waves instead of scanning every row.
+    """
+
+    def __init__(self, data):
+        from dashboard.shared import freeze  # Shared by every session, so read-only
+        self.data = freeze(data.set_index(CUBE_INDEX).sort_index())
+        self._positions = {key: position for position, key in enumerate(self.data.index)}
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        import pandas as pd  # Imported on first use to keep it off the app's startup path
+        return cls(pd.read_parquet(path))
+
+    def variables(self):
+        """Variables with results in the cube."""
+        return list(self.data.index.unique(level='Variable'))
+
+    def countries(self, age_group=ALL_AGES):
+        """Countries with results for `age_group`, in alphabetical order."""
+        return sorted({key[1] for key in self._positions if key[3] == age_group})
+
+    def waves(self, age_group=ALL_AGES):
+        """Waves with results for `age_group`."""
+        return sorted({int(key[2]) for key in self._positions if key[3] == age_group})
+
+    def query(self, variable, countries, waves, age_group=ALL_AGES):
+        """Results of one variable for the selected countries x waves; combinations without results are left out."""
+        positions = [self._positions[key] for key in product([variable], countries, waves, [age_group])
+                     if key in self._positions]
+        # Rows come back in key order, as a scan of the sorted table would return them
+        rows = self.data.iloc[sorted(positions)].reset_index()[RESULT_COLUMNS]
+        # Plain labels: a categorical column would make Plotly draw every known country
+        return rows.astype({'Country': 'object', 'Wave': 'int64'})
@@ -0,0 +1,120 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from dashboard.cube import CUBE_PATH, ResultsCube
+from dashboard.prepare import add_instrument_type, add_trend_display
+from dashboard.schema import CO2_DTYPES, CUBE_DTYPES, EPI_DTYPES, TAX_DTYPES, read_csv
+from mappings.country_registry import countries
+from mappings.variable_mappings_env import variable_mappings
+
+# The datasets the charts are built from, shared by app.py (which caches them per process),
+# api.py and scripts/export_static.py. Each one declares its file, how it is parsed and the
+# columns and dtypes it must have; a file that is missing or does not match is reported as a
+# DatasetError, so the app can leave out only the sections built from it. pandas is imported
+# on the first read.
+CO2_PATH = 'precalculated_data/co2_per_capita.parquet'  # Made by scripts/precompute_co2_data.py
+TAX_PATH = 'precalculated_data/tax_summary.csv'
+EPI_PATH = 'precalculated_data/epi.csv'
+
+# Countries selected when the page opens, and shown in Step 5
+DEFAULT_COUNTRIES = ['AUS', 'CAN', 'CHN', 'RUS', 'DEU', 'CHE', 'USA']
+
+
+class DatasetError(Exception):
+    """A dataset file is missing, cannot be parsed or does not match its schema."""
+
+
+class Dataset:
+    """
+    One file the charts read: `columns` it must have, the dtypes some of them must have, and
+    `prepare` to turn the checked table into what the charts use.
+
+    CSV files are parsed with the declared dtypes and `delimiter`; Parquet files carry theirs.
+    """
+
+    def __init__(self, path, columns, dtypes, delimiter=',', prepare=None):
+        self.path = path
+        self.columns = columns
+        self.dtypes = dtypes
+        self.delimiter = delimiter
+        self.prepare = prepare
+
+    def read(self):
+        """The table as stored, checked against the schema."""
+        import pandas as pd  # Imported on first use to keep it off the app's startup path
+
+        try:
+            if self.path.endswith('.parquet'):
+                data = pd.read_parquet(self.path)
+            else:
+                data = read_csv(self.path, self.dtypes, delimiter=self.delimiter)
+        except FileNotFoundError:
+            raise DatasetError(f"{self.path} is missing") from None
+        except Exception as error:  # Whatever pandas or pyarrow raise for a malformed file
+            raise DatasetError(f"{self.path} could not be read: {error}") from error
+
+        missing = [column for column in self.columns if column not in data.columns]
+        if missing:
+            raise DatasetError(f"{self.path} lacks the columns {', '.join(missing)}")
+        mistyped = [f"{column} is {data[column].dtype}, not {dtype}" for column, dtype in self.dtypes.items()
+                    if str(data[column].dtype) != dtype]
+        if mistyped:
+            raise DatasetError(f"{self.path} has the wrong column types: {'; '.join(mistyped)}")
+        return data
+
+    def load(self):
+        data = self.read()
+        return self.prepare(data) if self.prepare else data
+
+
+def _frozen(data):
+    from dashboard.shared import freeze
+    return freeze(data)
+
+
+def _prepare_tax(tax_data):
+    return _frozen(add_instrument_type(tax_data))
+
+
+def _prepare_epi(epi_data):
+    # regionCode is the lower-case ISO2 code; the charts select countries by ISO3
+    return _frozen(add_trend_display(epi_data.assign(ISO3=countries.to_iso3(epi_data['regionCode']))))
+
+
+DATASETS = {
+    # Percentages and confidence intervals per variable, country, wave and age group (Steps 1 and 2)
+    'results_cube': Dataset(CUBE_PATH, list(CUBE_DTYPES), CUBE_DTYPES, prepare=ResultsCube),
+    'co2_data': Dataset(CO2_PATH, list(CO2_DTYPES), CO2_DTYPES, prepare=_frozen),
+    'tax_data': Dataset(TAX_PATH, ['ISO3', 'Country', 'Carbon Tax', 'ETS'], TAX_DTYPES, prepare=_prepare_tax),
+    'epi_data': Dataset(EPI_PATH, ['regionCode', 'region', 'date', 'value', 'trend', 'rank'], EPI_DTYPES,
+                        delimiter=';', prepare=_prepare_epi),
+}
+
+
+def load(name):
+    """Read, check and prepare one dataset of DATASETS; raises DatasetError."""
+    return DATASETS[name].load()
+
+
+def start_loading(names=None, load=load):
+    """
+    Start loading datasets (all of them by default) at the same time, in a thread pool.
+
+    Returns a future per name; its result() waits for that dataset only and returns or
+    raises what `load(name)` does, so loading all of them takes as long as the slowest file.
+    """
+    names = list(DATASETS) if names is None else names
+    pool = ThreadPoolExecutor(max_workers=len(names), thread_name_prefix='dataset')
+    futures = {name: pool.submit(load, name) for name in names}
+    pool.shutdown(wait=False)  # The threads exit once their dataset is loaded
+    return futures
+
+
+def question_options(results_cube):
+    """Labels of the questions in variable_mappings that have results in the cube, by variable."""
+    variables = set(results_cube.variables())
+    return {
+        item_code: item_label
+        for item in variable_mappings
+        for item_code, item_label in item.items()
+        if item_code in variables
+    }
@@ -0,0 +1,128 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+# Figures kept per server process; the least recently used one is dropped first
+MAX_FIGURES = 128
+
+
+class FigureCache:
+    """
+    Process-wide LRU cache of built Plotly figures, shared by all Streamlit sessions.
+
+    Cached figures are handed to every session that asks for the same selection, so
+    callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries=MAX_FIGURES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+        self._lookups = threading.local()  # Per session thread, for dashboard.metrics
+
+    def get_or_build(self, key, build):
+        """Return the figure cached under `key`, building and storing it with `build()` on a miss."""
+        with self._lock:
+            if key in self._figures:
+                self.hits += 1
+                self._figures.move_to_end(key)
+                self._note('hit')
+                return self._figures[key]
+            self.misses += 1
+        self._note('miss')
+
+        # Build outside the lock so sessions asking for other figures are not held up
+        figure = build()
+        with self._lock:
+            self._figures[key] = figure
+            self._figures.move_to_end(key)
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return figure
+
+    def _note(self, outcome):
+        if not hasattr(self._lookups, 'outcomes'):
+            self._lookups.outcomes = []
+        self._lookups.outcomes.append(outcome)
+
+    def last_lookup(self):
+        """'hit' or 'miss' for the lookups this thread made since the last call ('mixed' for both, None for none)."""
+        outcomes = set(getattr(self._lookups, 'outcomes', []))
+        self._lookups.outcomes = []
+        return outcomes.pop() if len(outcomes) == 1 else 'mixed' if outcomes else None
+
+    def clear(self):
+        with self._lock:
+            self._figures.clear()
+
+    def discard(self, dataset):
+        """Drop the figures built from `dataset`, e.g. after a new version of it was loaded; returns how many."""
+        with self._lock:
+            stale = [key for key in self._figures if _key_uses(key, dataset)]
+            for key in stale:
+                del self._figures[key]
+        return len(stale)
+
+    def stats(self):
+        """Hit/miss counters and current size."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._figures),
+                    'max_entries': self.max_entries}
+
+
+figure_cache = FigureCache()
+
+
+class _Identity:
+    """Key part that compares by object identity and keeps the object alive, so its id is not reused."""
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __hash__(self):
+        return id(self.value)
+
+    def __eq__(self, other):
+        return isinstance(other, _Identity) and other.value is self.value
+
+
+def _cache_key(value):
+    # Selections become hashable tuples; datasets are keyed by identity, as they are loaded
+    # once per process with st.cache_resource and shared
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(value, (list, tuple)):
+        return tuple(_cache_key(item) for item in value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (pd.DataFrame, pd.Series)) or not _is_hashable(value):
+        return _Identity(value)
+    return value
+
+
+def _key_uses(key, dataset):
+    if isinstance(key, tuple):
+        return any(_key_uses(part, dataset) for part in key)
+    return key is dataset or (isinstance(key, _Identity) and key.value is dataset)
+
+
+def _is_hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+def cached_figure(builder):
+    """Memoize a figure builder in the shared figure cache, keyed on its name and arguments."""
+    @wraps(builder)
+    def wrapper(*args, **kwargs):
+        key = (builder.__name__, _cache_key(args), _cache_key(tuple(sorted(kwargs.items()))))
+        return figure_cache.get_or_build(key, lambda: builder(*args, **kwargs))
+    return wrapper
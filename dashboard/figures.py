@@ -0,0 +1,271 @@
+from dashboard.cube import YOUTH_AGE_GROUP
+from dashboard.figure_cache import cached_figure
+
+# plotly.express is imported inside the builders, on the first chart drawn, so importing this
+# module stays cheap
+
+custom_green_scale = [
+    "#99cc99",  # Soft, muted light green
+    "#33cc33",  # Bright green
+    "#00b359",  # Rich green
+    "#009933",  # Medium green
+    "#008000",  # Medium-dark green
+    "#006600",  # Dark green
+    "#004d00",  # Very dark green
+    "#003300"   # Very dark green (almost black)
+]
+
+# Map instruments to colors
+instrument_color_map = {
+    "None": "#ff0000",  # Strong red for None
+    "Carbon Tax": "#66bb6a",  # Light green for Carbon Tax
+    "ETS": "#006400",  # Dark green for ETS
+    "Both": "#003300",  # Very dark green for Both
+}
+
+
+# Line charts with this many countries or points are drawn with WebGL (scattergl) instead of
+# one SVG path per country, which makes the browser stutter when all countries are selected
+WEBGL_MIN_TRACES = 20
+WEBGL_MIN_POINTS = 1000
+
+# Trace properties Plotly Express sets to Plotly's own defaults, left out of the figure JSON
+DEFAULT_TRACE_PROPERTIES = {
+    'xaxis': 'x',
+    'yaxis': 'y',
+    'legendgroup': '',
+    'offsetgroup': '',
+    'line.dash': 'solid',
+    'marker.symbol': 'circle',
+    'marker.pattern.shape': '',
+}
+# Numeric arrays rounded to the precision the charts show
+ROUNDED_TRACE_PROPERTIES = ['x', 'y', 'z', 'text', 'marker.color', 'error_y.array', 'error_y.arrayminus']
+
+
+def render_mode(data, color_column):
+    """'webgl' for a line chart with many traces or points, else 'svg'."""
+    many = data[color_column].nunique() >= WEBGL_MIN_TRACES or len(data) >= WEBGL_MIN_POINTS
+    return 'webgl' if many else 'svg'
+
+
+def _property(trace, path):
+    """The dict holding property `path` ('marker.color') of a trace dict, and the property's name."""
+    *parents, name = path.split('.')
+    for parent in parents:
+        trace = trace.get(parent, {})
+    return trace, name
+
+
+def trim_payload(fig, decimals=None):
+    """
+    Shrink the JSON sent to the browser: round numbers to `decimals` (if given), leave out
+    properties set to their defaults and keep only the template entries of the trace types drawn.
+    """
+    import numpy as np
+    import plotly.graph_objects as go
+
+    # Edited as a dict: setting properties one by one on the figure validates each of them
+    spec = fig.to_dict()
+    for trace in spec['data']:
+        for path, default in DEFAULT_TRACE_PROPERTIES.items():
+            container, name = _property(trace, path)
+            if name in container and container[name] == default:
+                del container[name]
+        if trace['type'] == 'scatter' and trace.get('orientation') == 'v':
+            del trace['orientation']  # Only used for stacking
+        for path in ROUNDED_TRACE_PROPERTIES if decimals is not None else []:
+            container, name = _property(trace, path)
+            values = container.get(name)
+            if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+                container[name] = values.round(decimals)
+
+    # Streamlit's theme template lists defaults for every trace type Plotly has
+    template = spec['layout'].get('template', {})
+    types = {trace['type'] for trace in spec['data']}
+    template['data'] = {name: value for name, value in template.get('data', {}).items() if name in types}
+    if not template['data']:
+        del template['data']
+    return go.Figure(spec, _validate=False)
+
+
+def add_error_bars(data, value_column):
+    """Add the distance from the estimate to the bootstrap CI bounds as error_plus/error_minus columns."""
+    # Charts show point estimates only when the intervals have not been computed
+    data = data.assign(
+        error_plus=data['CI_High'] - data[value_column],
+        error_minus=data[value_column] - data['CI_Low']
+    )
+    return data, data['error_plus'].notna().any()
+
+
+@cached_figure
+def trend_figure(results_cube, question_key, countries, waves):
+    """Step 1: percentage favorable per wave for the selected countries, or None without data."""
+    import plotly.express as px
+
+    filtered_data = results_cube.query(
+        question_key, countries, waves
+    ).rename(columns={'Percentage_Favorable': 'mean_response'})
+
+    if filtered_data.empty:
+        return None
+
+    filtered_data, has_intervals = add_error_bars(filtered_data, 'mean_response')
+    fig = px.line(
+        filtered_data,
+        x='Wave',
+        y='mean_response',
+        color='Country',
+        markers=True,
+        render_mode=render_mode(filtered_data, 'Country'),
+        error_y='error_plus' if has_intervals else None,
+        error_y_minus='error_minus' if has_intervals else None,
+        labels={'Wave': 'Survey Wave', 'mean_response': f''},
+        # title=f'% of Agree and Strongly Agree to "{selected_question_label}" ',
+        # color_discrete_sequence=custom_green_scale
+        color_discrete_sequence=px.colors.sequential.Viridis
+    )
+    return trim_payload(fig, decimals=2)
+
+
+@cached_figure
+def youth_figure(results_cube, question_key, countries, wave):
+    """Step 2: percentage favorable of the under 29 group in one wave, or None without data."""
+    import plotly.express as px
+
+    filtered_age_data = results_cube.query(question_key, countries, [wave], YOUTH_AGE_GROUP)
+
+    if filtered_age_data.empty:
+        return None
+
+    filtered_age_data = filtered_age_data.sort_values(by='Percentage_Favorable', ascending=False)
+    filtered_age_data, has_intervals = add_error_bars(filtered_age_data, 'Percentage_Favorable')
+    fig = px.bar(
+        filtered_age_data,
+        x='Country',
+        y='Percentage_Favorable',
+        text='Percentage_Favorable',
+        color='Percentage_Favorable',
+        error_y='error_plus' if has_intervals else None,
+        error_y_minus='error_minus' if has_intervals else None,
+        color_continuous_scale=custom_green_scale,
+        labels={'Percentage_Favorable': 'Percentage Favorable (%)'}
+    )
+    fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
+    return trim_payload(fig, decimals=2)
+
+
+@cached_figure
+def co2_figure(co2_data, countries):
+    """Step 3: CO₂ emissions per capita 1981–2023 for the selected countries, or None without data."""
+    import plotly.express as px
+
+    filtered_co2_data = co2_data[
+        (co2_data['iso_code'].isin(countries)) &
+        (co2_data['year'].between(1981, 2023))
+    ]
+
+    if filtered_co2_data.empty:
+        return None
+
+    fig = px.line(
+        filtered_co2_data,
+        x='year',
+        y='co2_per_capita',
+        color='iso_code',
+        render_mode=render_mode(filtered_co2_data, 'iso_code'),
+        labels={'year': 'Year',
+                'co2_per_capita': 'CO₂ Emissions Per Capita (Metric Tons)'
+                },
+        # title="CO₂ Emissions Per Capita Trends (1981–2023)",
+        color_discrete_sequence=custom_green_scale
+    )
+    # Update the layout to set the legend title
+    fig.update_layout(legend_title_text='Country')
+    return trim_payload(fig, decimals=3)
+
+
+@cached_figure
+def carbon_pricing_map(tax_data):
+    """Step 4: map of carbon pricing instruments; `tax_data` needs the Instrument_Type column."""
+    import plotly.express as px
+
+    # Create the map using Plotly
+    fig_map = px.choropleth(
+        tax_data,
+        locations="ISO3",  # Country ISO3 codes
+        color="Instrument_Type",  # Color by instrument type
+        hover_name="Country",  # Display country name on hover
+        hover_data={"Carbon Tax": True, "ETS": True, "Instrument_Type": False},
+        title=" ",
+        color_discrete_map=instrument_color_map,
+        projection="natural earth"  # Use a modern map projection
+    )
+
+    # Customize the layout for a clean design
+    fig_map.update_layout(
+        geo=dict(
+            showframe=False,
+            showcoastlines=True,
+            projection_scale=1.2,  # Adjust map zoom level
+            center={"lat": 10, "lon": 0}  # Center the map
+        ),
+        margin=dict(t=50, b=50, l=50, r=50),
+        title=dict(
+            font=dict(size=24, color="#2e7d32"),
+            x=0.5  # Center the title
+        ),
+        height=500,
+        width=1200
+    )
+    return trim_payload(fig_map)
+
+
+@cached_figure
+def epi_figure(epi_data, countries):
+    """Step 5: 2024 Environmental Performance Index and its trend for the given ISO3 codes; needs ISO3 and trend_display."""
+    import plotly.express as px
+
+    # Filter the data for the countries and only for the year 2024
+    filtered_epi_data = epi_data[
+        (epi_data['ISO3'].isin(countries)) &
+        (epi_data['date'] == 2024)
+    ]
+
+    # Sort the data by value
+    sorted_epi_data = filtered_epi_data.sort_values(by='value', ascending=True)
+
+    # Create the barplot
+    fig_epi_combined = px.bar(
+        sorted_epi_data,
+        y='region',
+        x='value',
+        orientation='h',
+        text='value',
+        color='value',
+        color_continuous_scale=custom_green_scale,
+        labels={
+            'value': 'Environmental Performance Index (EPI)',
+            'region': 'Country',
+            'trend_display': 'Trend'
+        },
+        # title="Environmental Performance Index (EPI) for Selected Countries (2024)"
+    )
+
+    # Add EPI and trend data to the bar labels
+    fig_epi_combined.update_traces(
+        texttemplate='EPI: %{x:.1f} Trend: %{customdata[0]}',  # Position text next to each other
+        customdata=sorted_epi_data[['trend_display']].to_numpy(),  # Pass trend_display column as customdata
+        textposition='inside',
+        textfont=dict(size=18)  # Make text larger
+    )
+
+    # Customize the chart
+    fig_epi_combined.update_layout(
+        yaxis=dict(title="Country"),
+        xaxis=dict(title="EPI Score"),
+        margin=dict(t=50, b=50, l=100, r=50),
+        coloraxis_showscale=False  # Hide the color scale
+    )
+    return trim_payload(fig_epi_combined, decimals=1)
@@ -0,0 +1,188 @@
+import json
+import os
+import sys
+import threading
+import time
+
+from dashboard import profiling
+from dashboard.figure_cache import figure_cache
+
+# Per-rerun timings of the app's sections. Recording is on for a session opened with
+# ?debug=1 (shown in a sidebar panel), and for every session when WVS_METRICS_LOG is set
+# (one JSON line per rerun on stderr) or WVS_METRICS_TEXTFILE names a file (Prometheus text
+# format, rewritten after every rerun, e.g. for node_exporter's textfile collector).
+# Otherwise section_done() only checks a flag.
+DEBUG_QUERY_PARAM = 'debug'
+LOG_ENV = 'WVS_METRICS_LOG'
+TEXTFILE_ENV = 'WVS_METRICS_TEXTFILE'
+
+log_runs = bool(os.environ.get(LOG_ENV))
+textfile = os.environ.get(TEXTFILE_ENV)
+
+_state = threading.local()  # Streamlit runs every script run in a thread of its own
+
+# Process-wide totals for the Prometheus export: section -> [count, seconds, rows, payload bytes]
+_totals = {}
+_totals_lock = threading.Lock()
+
+
+def _query_debug():
+    import streamlit as st
+    return st.query_params.get(DEBUG_QUERY_PARAM) not in (None, '', '0', 'false')
+
+
+def _script_context():
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    return get_script_run_ctx()
+
+
+def start_run():
+    """Call at the top of the script: decides whether this rerun is recorded and starts its clock."""
+    profiling.start_run()
+    if _enable():
+        _begin(fragment=False)
+
+
+def _enable():
+    _state.debug = _query_debug()
+    _state.enabled = _state.debug or log_runs or bool(textfile)
+    return _state.enabled
+
+
+def _begin(fragment):
+    _state.sections = []
+    _state.fragment = fragment
+    _state.started = _state.last = time.perf_counter()
+    figure_cache.last_lookup()  # Forget lookups made before this run
+
+
+def _is_fragment_rerun():
+    context = _script_context()
+    return bool(context and context.fragment_ids_this_run)
+
+
+def start_fragment():
+    """Call at the top of an st.fragment: a rerun of only the fragment is recorded as a run of its own."""
+    if _is_fragment_rerun() and _enable():
+        _begin(fragment=True)
+
+
+def finish_fragment():
+    """Call at the end of an st.fragment, after its section_done()."""
+    if getattr(_state, 'enabled', False) and _is_fragment_rerun():
+        _export()
+
+
+def figure_rows(figure):
+    """Number of points a Plotly figure draws."""
+    rows = 0
+    for trace in figure.data:
+        values = trace.locations if trace.type == 'choropleth' else trace.x if trace.x is not None else trace.y
+        rows += len(values) if values is not None else 0
+    return rows
+
+
+def section_done(name, figure=None, rows=None):
+    """
+    Close section `name`, which ran since the previous section_done() (or the start of the run).
+
+    With `figure`, the points it draws, its JSON size and whether it came from the figure cache
+    are recorded too; `rows` overrides the number of points.
+    """
+    profiling.section_done(name)
+    if not getattr(_state, 'enabled', False):
+        return
+    now = time.perf_counter()
+    record = {'section': name, 'seconds': now - _state.last, 'rows': rows, 'payload_bytes': None,
+              'cache': figure_cache.last_lookup()}
+    if figure is not None:
+        record['payload_bytes'] = len(figure.to_json())
+        if rows is None:
+            record['rows'] = figure_rows(figure)
+    _state.sections.append(record)
+    # Time spent measuring the payload is not charged to the next section
+    _state.last = time.perf_counter()
+
+    with _totals_lock:
+        totals = _totals.setdefault(name, [0, 0.0, 0, 0])
+        totals[0] += 1
+        totals[1] += record['seconds']
+        totals[2] += record['rows'] or 0
+        totals[3] += record['payload_bytes'] or 0
+
+
+def run_record():
+    """The sections recorded so far in this session's current run."""
+    return {
+        'time': time.time(),
+        'fragment': _state.fragment,
+        'seconds': time.perf_counter() - _state.started,
+        'sections': list(_state.sections),
+    }
+
+
+def section_totals():
+    """Process-wide totals per section since the server started."""
+    with _totals_lock:
+        return {name: {'runs': runs, 'seconds': seconds, 'rows': rows, 'payload_bytes': payload_bytes}
+                for name, (runs, seconds, rows, payload_bytes) in _totals.items()}
+
+
+def prometheus_text():
+    """Process-wide section totals and figure cache counters in the Prometheus text format."""
+    lines = []
+    with _totals_lock:
+        totals = {name: list(values) for name, values in _totals.items()}
+    for metric, index, kind, help_text in [
+        ('wvs_section_runs_total', 0, 'counter', 'Times the section ran'),
+        ('wvs_section_seconds_total', 1, 'counter', 'Time spent in the section'),
+        ('wvs_section_rows_total', 2, 'counter', 'Points drawn by the section'),
+        ('wvs_section_payload_bytes_total', 3, 'counter', 'Figure JSON sent by the section'),
+    ]:
+        lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}']
+        lines += [f'{metric}{{section="{name}"}} {values[index]}' for name, values in totals.items()]
+    stats = figure_cache.stats()
+    for metric, key in [('wvs_figure_cache_hits_total', 'hits'), ('wvs_figure_cache_misses_total', 'misses')]:
+        lines += [f'# TYPE {metric} counter', f'{metric} {stats[key]}']
+    lines += ['# TYPE wvs_figure_cache_entries gauge', f"wvs_figure_cache_entries {stats['entries']}"]
+    return '\n'.join(lines) + '\n'
+
+
+def _export():
+    record = run_record()
+    if log_runs:
+        print(json.dumps(record), file=sys.stderr, flush=True)
+    if textfile:
+        # Write then rename, so a scrape never reads a half-written file
+        with open(f'{textfile}.tmp', 'w') as f:
+            f.write(prometheus_text())
+        os.replace(f'{textfile}.tmp', textfile)
+    return record
+
+
+def finish_run():
+    """Call at the end of the script: exports the run and draws the debug panel when asked for."""
+    profiling.finish_run()
+    if not getattr(_state, 'enabled', False):
+        return
+    record = _export()
+    if _state.debug:
+        render_debug_panel(record)
+
+
+def render_debug_panel(record):
+    import streamlit as st
+
+    with st.sidebar:
+        st.markdown("### Debug: section timings")
+        st.caption(f"Run took {record['seconds'] * 1000:.0f} ms")
+        st.table([
+            {'section': section['section'], 'ms': round(section['seconds'] * 1000, 1), 'rows': section['rows'],
+             'payload KB': round(section['payload_bytes'] / 1024, 1) if section['payload_bytes'] else None,
+             'figure cache': section['cache']}
+            for section in record['sections']
+        ])
+        with st.expander("JSON"):
+            st.code(json.dumps(record, indent=2), language='json')
+        with st.expander("Prometheus"):
+            st.code(prometheus_text(), language='text')
@@ -0,0 +1,26 @@
+# Derived columns of the Step 4 and Step 5 datasets. They are added once when the cached
+# loaders read the files, so the render path only filters and sorts.
+
+
+def add_instrument_type(tax_data):
+    """Label each country 'Both', 'Carbon Tax', 'ETS' or 'None' by the instruments it has implemented."""
+    import numpy as np
+
+    has_tax = tax_data['Carbon Tax'] > 0
+    has_ets = tax_data['ETS'] > 0
+    tax_data['Instrument_Type'] = np.select(
+        [has_tax & has_ets, has_tax, has_ets],
+        ["Both", "Carbon Tax", "ETS"],
+        default="None"
+    )
+    return tax_data
+
+
+def add_trend_display(epi_data):
+    """Add the trend direction as an arrow (trend_arrow) and arrow plus absolute change (trend_display)."""
+    import numpy as np
+
+    trend = epi_data['trend']
+    epi_data['trend_arrow'] = np.select([trend > 0, trend < 0], ["↑", "↓"], default="→")
+    epi_data['trend_display'] = epi_data['trend_arrow'] + " " + trend.abs().map('{:.1f}'.format)
+    return epi_data
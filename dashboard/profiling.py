@@ -0,0 +1,76 @@
+import json
+import os
+import sys
+import threading
+import time
+from functools import wraps
+
+# Set WVS_STARTUP_PROFILE=1 to record how long the first run of app.py spends in each data
+# loader and each section; set it to a file path to also write the report there as JSON.
+# benchmarks/startup_profile.py runs the app with it and checks the times against a budget.
+PROFILE_ENV = 'WVS_STARTUP_PROFILE'
+
+enabled = bool(os.environ.get(PROFILE_ENV))
+
+# First duration seen per name, in seconds, and the modules loaded when each section finished
+loads = {}
+sections = {}
+modules_after = {}
+
+_started = time.perf_counter()
+_state = threading.local()
+
+
+def profiled_load(loader):
+    """Record the time of the first call of a data loader (put it under the st.cache_* decorator)."""
+    if not enabled:
+        return loader
+
+    @wraps(loader)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return loader(*args, **kwargs)
+        finally:
+            loads.setdefault(loader.__name__, time.perf_counter() - start)
+    return wrapper
+
+
+def start_run():
+    """Mark the start of a script run; the first section is timed from here."""
+    if enabled:
+        _state.last = time.perf_counter()
+
+
+def section_done(name):
+    """Record the time since the previous section (or start_run) as the render time of `name`."""
+    if not enabled:
+        return
+    now = time.perf_counter()
+    if name not in sections:
+        sections[name] = now - getattr(_state, 'last', _started)
+        modules_after[name] = sorted(sys.modules)
+    _state.last = now
+
+
+def report():
+    return {
+        'since_import_seconds': time.perf_counter() - _started,
+        'loads': dict(loads),
+        'sections': dict(sections),
+    }
+
+
+def finish_run():
+    """Print the report at the end of the first profiled run, and write it to the file named by the variable."""
+    if not enabled or getattr(finish_run, 'done', False):
+        return
+    finish_run.done = True
+    result = report()
+    for kind in ('loads', 'sections'):
+        for name, seconds in result[kind].items():
+            print(f"[startup] {kind[:-1]} {name}: {seconds * 1000:.0f} ms", file=sys.stderr)
+    path = os.environ[PROFILE_ENV]
+    if path not in ('1', 'true'):
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
@@ -0,0 +1,46 @@
+# Column dtypes of the datasets app.py reads; the CO₂ ones are applied when
+# scripts/precompute_co2_data.py builds its table. The CO₂ country codes are categoricals, so the
+# isin() filter of Step 3 compares small integer codes instead of strings, and years, dates
+# and ranks are small integers. The tax and EPI tables have one row per country (and year),
+# too few repeats for a categorical to pay off: benchmarks/dtype_report.py measured them
+# larger and their isin() slower, so their names stay strings. Values stay float64: as
+# float32, 61.1 would reach the charts' hover labels as 61.099998. Columns a file has but
+# that are not listed keep pandas' defaults; listed columns a file lacks are ignored.
+# The results cube of Steps 1 and 2 gets its dtypes from scripts/precompute_results_cube.py,
+# which writes it with CUBE_DTYPES. dashboard/datasets.py checks every loaded table against these.
+
+CUBE_DTYPES = {
+    'Variable': 'category',
+    'Country': 'category',
+    'Wave': 'int8',
+    'Age_Group': 'int8',
+    'Percentage_Favorable': 'float64',
+    'CI_Low': 'float64',
+    'CI_High': 'float64',
+}
+
+CO2_DTYPES = {
+    'iso_code': 'category',
+    'year': 'int16',
+    'co2_per_capita': 'float64',
+}
+
+TAX_DTYPES = {
+    'Carbon Tax': 'int16',  # Year the instrument was implemented, 0 when it was not
+    'ETS': 'int16',
+}
+
+EPI_DTYPES = {
+    'date': 'int16',
+    'value': 'float64',
+    'trend': 'float64',
+    'rank': 'int16',
+}
+
+
+def read_csv(path, dtypes, **kwargs):
+    """pd.read_csv with the declared dtypes."""
+    import pandas as pd  # Imported on first use to keep it off the app's startup path
+
+    return pd.read_csv(path, dtype=dtypes, **kwargs)
+
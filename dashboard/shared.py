@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+
+# Datasets are loaded once per server process (st.cache_resource) and every session reads
+# the same frames, so they are frozen: their column arrays (and categorical codes) are
+# read-only, and the methods and indexers that write values, add, drop or replace columns or
+# rows, or relabel the frame raise. Selections and .copy() return ordinary frames that a
+# session may change; a single column (frame['value']) is a read-only view without a copy.
+# Import this module where the data is loaded, not at the top of app.py: it imports pandas.
+
+READ_ONLY_MESSAGE = "Shared datasets are read-only; change a .copy() or a selection instead"
+
+
+class _ReadOnlyIndexer:
+    """.loc, .iloc, .at or .iat of a shared frame: reads pass through, writes raise."""
+
+    __slots__ = ('_indexer',)
+
+    def __init__(self, indexer):
+        self._indexer = indexer
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        # Writing a value the column's dtype cannot hold, or a new row label, would replace
+        # the column or the whole frame instead of writing into the read-only arrays
+        raise TypeError(READ_ONLY_MESSAGE)
+
+    def __call__(self, axis=None):
+        return _ReadOnlyIndexer(self._indexer(axis))
+
+
+class SharedFrame(pd.DataFrame):
+    """DataFrame whose values, columns and index cannot be changed in place."""
+
+    @property
+    def _constructor(self):
+        # Anything derived from a shared frame is a plain, writable DataFrame
+        return pd.DataFrame
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(READ_ONLY_MESSAGE)
+
+    __setitem__ = __delitem__ = insert = pop = update = isetitem = _read_only
+    _set_item = _set_item_mgr = _iset_item = _set_value = _read_only
+
+    # Every inplace=True method (fillna, rename, drop, sort_values, ...) ends up here
+    _update_inplace = _read_only
+
+    def _consolidate_inplace(self):
+        # Merging the columns into one block per dtype would replace the frame's data; reads
+        # work on the unconsolidated columns too
+        pass
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(super().loc)
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(super().iloc)
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(super().at)
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(super().iat)
+
+    def __setattr__(self, name, value):
+        # columns and index have setters, _mgr holds the data once the frame is built
+        if name in ('columns', 'index') or (name == '_mgr' and '_mgr' in self.__dict__):
+            self._read_only()
+        if name in getattr(self, 'columns', ()):
+            self._read_only()
+        super().__setattr__(name, value)
+
+
+def _read_only_array(column):
+    """The values of `column` as a read-only numpy array, or a categorical on read-only codes."""
+    values = column.array
+    if isinstance(values, pd.Categorical):
+        # The codes are copied (they are small integers), so the frozen frame does not share
+        # them with `frame`
+        codes = values.codes.copy()
+        codes.flags.writeable = False
+        return pd.Categorical.from_codes(codes, dtype=values.dtype, validate=False)
+    if isinstance(column.dtype, np.dtype):
+        values = column.to_numpy()
+        values.flags.writeable = False
+        return values
+    # Other extension arrays keep their data in buffers numpy flags do not cover
+    raise TypeError(f"Cannot freeze a column of dtype {column.dtype}")
+
+
+def freeze(frame):
+    """A SharedFrame with the data of `frame`, one read-only array per column."""
+    columns = {name: _read_only_array(frame[name]) for name in frame.columns}
+    # copy=False keeps the arrays as they are, without consolidating them into one block per dtype
+    return SharedFrame(columns, index=frame.index, copy=False)
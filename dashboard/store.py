@@ -0,0 +1,142 @@
+import hashlib
+import os
+import sys
+import threading
+
+from dashboard.datasets import DATASETS, DatasetError, load, start_loading
+
+# Set WVS_RELOAD_SECONDS to how often the app checks the files of its datasets for changes
+# (every 10 seconds by default, 0 to never check). A dataset whose file changed is read again
+# in the background and swapped in once it is complete; the figures built from the previous
+# version are dropped from the figure cache. Publish new files by writing them elsewhere and
+# moving them into precalculated_data/, so a reader never finds a file half written.
+RELOAD_ENV = 'WVS_RELOAD_SECONDS'
+DEFAULT_RELOAD_SECONDS = 10
+
+# Reads of a file that changed while it was being read are retried this many times
+MAX_READ_ATTEMPTS = 3
+
+
+def reload_seconds():
+    return float(os.environ.get(RELOAD_ENV, DEFAULT_RELOAD_SECONDS))
+
+
+def file_identity(path):
+    """(size, modification time in ns) of a file, or None when it does not exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DatasetStore:
+    """
+    The datasets of one process, each kept with the identity and content hash of the file it
+    was read from, and read again when that file changes.
+
+    get() hands out the version loaded last. A new version replaces it in one assignment
+    after it has been read and checked in full, so a run never sees a partly loaded dataset;
+    runs already holding the previous version keep using it. A file has to keep the same
+    identity for two checks in a row before it is read, so one still being copied in place
+    is left alone, and a file that changes only its modification time is not read again.
+    When a changed file is missing or broken, the previous version is kept.
+
+    `on_reload(name, previous)` is called after a new version of `name` is swapped in.
+    """
+
+    def __init__(self, names=None, on_reload=None):
+        self.names = list(DATASETS) if names is None else names
+        self.on_reload = on_reload
+        self.reloads = 0
+        self._entries = {}  # Name -> (identity, digest, dataset or DatasetError)
+        self._pending = {}  # Name -> changed identity seen on the last check
+        self._loading = start_loading(self.names, self._read)
+        self._stop = threading.Event()
+
+    def _read(self, name):
+        """(identity, digest, dataset) of the file as it is now; the dataset is a DatasetError when it cannot be loaded."""
+        path = DATASETS[name].path
+        for _ in range(MAX_READ_ATTEMPTS):
+            identity = file_identity(path)
+            try:
+                digest = file_digest(path) if identity else None
+            except OSError:  # Removed meanwhile; load() reports it
+                digest = None
+            try:
+                dataset = load(name)
+            except DatasetError as error:
+                dataset = error
+            if file_identity(path) == identity:
+                break
+        return identity, digest, dataset
+
+    def _entry(self, name):
+        entry = self._entries.get(name)
+        if entry is None:
+            # The first version, from the loads started together in __init__
+            entry = self._entries.setdefault(name, self._loading[name].result())
+        return entry
+
+    def get(self, name):
+        """The dataset loaded last under `name`; raises its DatasetError when it could not be loaded."""
+        dataset = self._entry(name)[2]
+        if isinstance(dataset, DatasetError):
+            raise dataset
+        return dataset
+
+    def check(self, name):
+        """Reload `name` if its file changed and has since stayed the same; returns True when a new version was swapped in."""
+        identity, digest, dataset = self._entry(name)
+        path = DATASETS[name].path
+        current = file_identity(path)
+        if current == identity or current is None:
+            self._pending.pop(name, None)
+            return False
+        if self._pending.get(name) != current:
+            self._pending[name] = current  # Read it on the next check if it stays like this
+            return False
+        del self._pending[name]
+
+        new_identity, new_digest, new_dataset = self._read(name)
+        if new_digest is not None and new_digest == digest:
+            # Touched or copied over with the same content
+            self._entries[name] = (new_identity, digest, dataset)
+            return False
+        if isinstance(new_dataset, DatasetError) and not isinstance(dataset, DatasetError):
+            print(f"[reload] keeping the loaded {name}: {new_dataset}", file=sys.stderr, flush=True)
+            self._entries[name] = (new_identity, digest, dataset)
+            return False
+
+        self._entries[name] = (new_identity, new_digest, new_dataset)
+        self.reloads += 1
+        print(f"[reload] {name} reloaded from {path}", file=sys.stderr, flush=True)
+        if self.on_reload and not isinstance(dataset, DatasetError):
+            self.on_reload(name, dataset)
+        return True
+
+    def watch(self, interval):
+        """Check every dataset for changes every `interval` seconds in a daemon thread (not at all for 0)."""
+        if interval <= 0:
+            return
+        thread = threading.Thread(target=self._watch, args=(interval,), name='dataset-watcher', daemon=True)
+        thread.start()
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            for name in self.names:
+                try:
+                    self.check(name)
+                except Exception as error:  # Keep watching the other files
+                    print(f"[reload] checking {name} failed: {error}", file=sys.stderr, flush=True)
+
+    def stop(self):
+        self._stop.set()
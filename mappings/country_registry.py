@@ -0,0 +1,73 @@
+import pycountry
+
+from mappings.country_mapping import country_info
+
+# Lookups between the names and codes of every ISO 3166-1 country, built once at import from
+# pycountry, with the names of mappings/country_mapping.py (the WVS countries) as display
+# names where it has them. Every dataset is joined on ISO3; names and other codes are only
+# turned into ISO3 (or back into a display name) through the registry.
+
+# Names other datasets use for a country, by ISO3 (EPI, World Bank, Our World in Data)
+ALIASES = {
+    'BHS': ['The Bahamas'],
+    'KOR': ['South Korea', 'Korea, Rep.', 'Republic of Korea'],
+    'MKD': ['North Macedonia'],
+    'RUS': ['Russia'],
+    'USA': ['United States'],
+    'VNM': ['Vietnam'],
+}
+
+
+def iso_countries():
+    """Every country of ISO 3166-1, as records like those of mappings/country_mapping.py."""
+    return [{'country_name': getattr(country, 'common_name', country.name), 'country_2': country.alpha_2,
+             'country_3': country.alpha_3, 'country_code': str(int(country.numeric))}
+            for country in pycountry.countries]
+
+
+class CountryRegistry:
+    """
+    Country names and ISO 3166 codes with a hash index per identifier.
+
+    iso3() accepts a name, an alias, an ISO2, ISO3 or numeric code in any letter case;
+    to_iso3() converts a whole pandas column, looking up each distinct value once. A later
+    record of the same ISO3 gives the display name; the names of all of them are recognized.
+    """
+
+    def __init__(self, countries, aliases=None):
+        countries = list(countries)
+        self.records = {info['country_3']: info for info in countries}
+        self._names = {iso3: info['country_name'] for iso3, info in self.records.items()}
+        self._iso3 = {}
+        for info in countries:
+            iso3 = info['country_3']
+            keys = [info['country_name'], info['country_2'], iso3, info['country_code'], *(aliases or {}).get(iso3, [])]
+            self._iso3.update({self._key(key): iso3 for key in keys})
+        self._iso3_by_name = {name: iso3 for iso3, name in self._names.items()}
+
+    @staticmethod
+    def _key(value):
+        return str(value).strip().casefold()
+
+    def iso3(self, value, default=None):
+        """ISO3 code of a name, alias, ISO2, ISO3 or numeric code; `default` when it is unknown."""
+        return self._iso3.get(self._key(value), default)
+
+    def name(self, iso3, default=None):
+        """Display name of an ISO3 code; `default` when it is unknown."""
+        return self._names.get(iso3, default)
+
+    def iso3_of_names(self, names):
+        """ISO3 codes of display names, in the same order; unknown names are passed through."""
+        return [self._iso3_by_name.get(name, name) for name in names]
+
+    def names_of(self, codes):
+        """Display names of ISO3 codes, in the same order; unknown codes are passed through."""
+        return [self._names.get(code, code) for code in codes]
+
+    def to_iso3(self, column):
+        """ISO3 codes of a pandas Series of names or codes (NaN where unknown)."""
+        return column.map({value: self.iso3(value) for value in column.dropna().unique()})
+
+
+countries = CountryRegistry(iso_countries() + country_info, ALIASES)
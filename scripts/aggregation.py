@@ -0,0 +1,191 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from dashboard.cube import YOUTH_AGE_GROUP
+
+# Grouping keys of the raw WVS time-series and the names used in the output files
+KEY_COLUMNS = ['COUNTRY_ALPHA', 'S002VS', 'X003R2']
+OUTPUT_KEYS = ['Country', 'Wave', 'Age_Group']
+
+# WVS survey weight; respondents with a missing or invalid weight count with weight 1.
+# Weighted counts are kept as integers in millionths, so sums do not depend on how rows are chunked
+WEIGHT_COLUMN = 'S017'
+WEIGHT_SCALE = 1_000_000
+
+# Bootstrap settings for the confidence intervals of the percentages
+BOOTSTRAP_REPLICATES = 200
+CONFIDENCE_LEVEL = 0.95
+BOOTSTRAP_SEED = 2024
+BOOTSTRAP_BATCH_ROWS = 50_000
+
+# Age groups reported in precomputed_env_data.csv (X003R2); precomputed_age_data.csv holds
+# YOUTH_AGE_GROUP, the X003R2 code the results cube keeps as its youth Age_Group
+AGE_GROUPS = [1, 2, 3]
+
+
+def favorable_codes(var):
+    """Raw answer codes that count as favorable once the scale is reversed (5 - x)."""
+    # B008: only a reversed answer of 4 (raw 1); everything else: reversed 3 or 4 (raw 1 or 2)
+    return [1] if var == "B008" else [1, 2]
+
+
+def survey_weights(data):
+    """S017 weight of every row, 1 where it is missing, invalid or not in the data."""
+    if WEIGHT_COLUMN not in data.columns:
+        return np.ones(len(data))
+    weights = data[WEIGHT_COLUMN].to_numpy(dtype='float64', na_value=np.nan)
+    return np.where(weights > 0, weights, 1.0)
+
+
+def partial_counts(data, env_vars):
+    """
+    Weighted count of valid (> 0) and favorable answers for every variable in one grouped
+    pass over (COUNTRY_ALPHA, S002VS, X003R2).
+
+    The result holds plain sums, so counts of several chunks can be merged with
+    merge_counts().
+    """
+    data = data.dropna(subset=['COUNTRY_ALPHA', 'S002VS'])
+    weights = np.rint(survey_weights(data) * WEIGHT_SCALE).astype('int64')
+    counts = {column: data[column].to_numpy() for column in KEY_COLUMNS}
+    for var in env_vars:
+        values = data[var].to_numpy(dtype='float64', na_value=np.nan)
+        counts[f'{var}_total'] = np.where(values > 0, weights, 0)
+        counts[f'{var}_favorable'] = np.where(np.isin(values, favorable_codes(var)), weights, 0)
+
+    # Keep rows without an age group: they still count towards the all-ages totals
+    return pd.DataFrame(counts).groupby(KEY_COLUMNS, dropna=False, sort=False).sum()
+
+
+def bootstrap_intervals(data, env_vars, replicates=BOOTSTRAP_REPLICATES, seed=BOOTSTRAP_SEED,
+                        batch_rows=BOOTSTRAP_BATCH_ROWS):
+    """
+    Percentile bootstrap confidence intervals of the weighted percentage favorable per
+    country, wave and variable.
+
+    Every respondent gets `replicates` Poisson(1) resample multipliers on top of their survey
+    weight, and the replicate sums of all (country, wave) groups in a batch are taken at once
+    with np.add.reduceat. Rows are put in a stable (country, wave) order first, so the
+    intervals do not depend on how the data was read.
+    """
+    data = data.dropna(subset=KEY_COLUMNS[:2]).sort_values(KEY_COLUMNS[:2], kind='stable')
+    countries = data[KEY_COLUMNS[0]].to_numpy()
+    waves = data[KEY_COLUMNS[1]].to_numpy(dtype='int64')
+    weights = survey_weights(data).astype('float32')
+    values = {var: data[var].to_numpy(dtype='float64', na_value=np.nan) for var in env_vars}
+
+    # First row of every (country, wave) group, and batches of whole groups of about batch_rows rows
+    group_starts = np.flatnonzero(np.r_[True, (countries[1:] != countries[:-1]) | (waves[1:] != waves[:-1])])
+    group_ends = np.r_[group_starts[1:], len(data)]
+    batch_ids = group_starts // batch_rows
+
+    rng = np.random.default_rng(seed)
+    tail = (1 - CONFIDENCE_LEVEL) / 2 * 100
+    frames = []
+    for batch in np.unique(batch_ids):
+        starts = group_starts[batch_ids == batch]
+        first, last = starts[0], group_ends[batch_ids == batch][-1]
+        offsets = starts - first
+        # float32 halves the memory traffic of the (rows x replicates) products below
+        multipliers = rng.poisson(1.0, size=(last - first, replicates)).astype('float32') * weights[first:last, None]
+
+        for var in env_vars:
+            var_values = values[var][first:last]
+            valid = var_values > 0
+            favorable = np.isin(var_values, favorable_codes(var))
+            total = np.add.reduceat(multipliers * valid[:, None], offsets, axis=0)
+            favorable_total = np.add.reduceat(multipliers * favorable[:, None], offsets, axis=0)
+
+            with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+                # Groups where no replicate has a valid answer give all-NaN rows
+                warnings.simplefilter('ignore', RuntimeWarning)
+                low, high = np.nanpercentile(_percentage(favorable_total, total), [tail, 100 - tail], axis=1)
+
+            answered = np.add.reduceat(valid, offsets) > 0
+            frames.append(pd.DataFrame({
+                'Country': countries[starts][answered],
+                'Wave': waves[starts][answered],
+                'Variable': var,
+                'CI_Low': low[answered],
+                'CI_High': high[answered],
+            }))
+
+    return pd.concat(frames, ignore_index=True).sort_values(['Variable', 'Country', 'Wave'], ignore_index=True)
+
+
+def merge_counts(parts):
+    """Add up partial counts computed on separate chunks of the data."""
+    parts = list(parts)
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=list(range(len(KEY_COLUMNS))), dropna=False, sort=False).sum()
+
+
+def partial_max(data, columns):
+    """Max of the valid (> 0) answers of `columns` per country and wave."""
+    answers = data[columns].where(data[columns] > 0)
+    answers[KEY_COLUMNS[:2]] = data[KEY_COLUMNS[:2]]
+    return answers.groupby(KEY_COLUMNS[:2]).max()
+
+
+def merge_max(parts):
+    """Combine maxima computed on separate chunks of the data."""
+    parts = list(parts)
+    if len(parts) == 1:
+        return parts[0]
+    return pd.concat(parts).groupby(level=[0, 1]).max()
+
+
+def _percentage(favorable, total):
+    return favorable / total * 100
+
+
+def env_percentages(counts, env_vars):
+    """
+    Build the precomputed_env_data.csv table: percentage favorable per country and wave,
+    repeated for each age group that answered the variable.
+    """
+    by_wave = counts.groupby(level=[0, 1], sort=False).sum()
+    by_age = counts[counts.index.get_level_values(2).isin(AGE_GROUPS)]
+
+    frames = []
+    for var in env_vars:
+        total = by_wave[f'{var}_total']
+        favorable = by_wave[f'{var}_favorable']
+        # Country/wave cells with no respondents or no favorable answers are left out
+        percentage = _percentage(favorable, total)[(total > 0) & (favorable > 0)]
+
+        answered = by_age[by_age[f'{var}_total'] > 0].index.to_frame(index=False, name=KEY_COLUMNS)
+        rows = answered.merge(percentage.rename('Percentage_Favorable').reset_index(), on=KEY_COLUMNS[:2])
+        rows['Variable'] = var
+        frames.append(rows)
+
+    return _pivot(pd.concat(frames, ignore_index=True), KEY_COLUMNS)
+
+
+def youth_percentages(counts, env_vars):
+    """Build the precomputed_age_data.csv table: percentage favorable of the under 29 group per country and wave."""
+    youth = counts[counts.index.get_level_values(2) == YOUTH_AGE_GROUP].droplevel(2)
+
+    frames = []
+    for var in env_vars:
+        total = youth[f'{var}_total']
+        favorable = youth[f'{var}_favorable']
+        percentage = _percentage(favorable, total)[total > 0]
+
+        rows = percentage.rename('Percentage_Favorable').reset_index()
+        rows['Variable'] = var
+        frames.append(rows)
+
+    return _pivot(pd.concat(frames, ignore_index=True), KEY_COLUMNS[:2])
+
+
+def _pivot(trend_data, keys):
+    # Same layout as the original loop output: one row per key, one column per variable
+    trend_data = trend_data.rename(columns=dict(zip(KEY_COLUMNS, OUTPUT_KEYS)))
+    index = OUTPUT_KEYS[:len(keys)]
+    for column in index[1:]:
+        trend_data[column] = trend_data[column].astype('int64')
+    return trend_data.pivot(index=index, columns="Variable", values="Percentage_Favorable").reset_index()
@@ -0,0 +1,222 @@
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dashboard.assets import HEADER_SOURCE, header_variants
+
+# Every file in precalculated_data/ (and the Parquet cache they are built from), the files it
+# is made from and the script that makes it. A step runs when an output is missing or older
+# than any of its inputs; inputs that are outputs of other steps make those steps run first.
+# 'sources' are alternative inputs of which at least one has to exist, 'optional_inputs' are
+# only used when present.
+SHARED_SOURCES = ['scripts/aggregation.py', 'scripts/ingest.py', 'mappings/variable_mappings_env.py', 'dashboard/cube.py']
+RAW_WVS_SOURCES = ['data/data.csv', 'data/parquet/_source.json']
+
+STEPS = {
+    'parquet_cache': {
+        'outputs': ['data/parquet/_source.json'],
+        'inputs': ['data/data.csv', 'scripts/convert_to_parquet.py', 'scripts/ingest.py'],
+        'module': 'scripts.convert_to_parquet',
+    },
+    'precomputed_env_data': {
+        'outputs': ['precalculated_data/precomputed_env_data.csv'],
+        'inputs': ['scripts/precompute_env_data.py', *SHARED_SOURCES],
+        'sources': RAW_WVS_SOURCES,
+        'module': 'scripts.precompute_env_data',
+        'workers': True,
+    },
+    'precomputed_age_data': {
+        'outputs': ['precalculated_data/precomputed_age_data.csv'],
+        # Runs after the env step: both share the counts in data/precompute_state
+        'inputs': ['precalculated_data/precomputed_env_data.csv', 'scripts/precomputed_age_data.py', *SHARED_SOURCES],
+        'sources': RAW_WVS_SOURCES,
+        'module': 'scripts.precomputed_age_data',
+        'workers': True,
+    },
+    'precomputed_max': {
+        'outputs': ['precalculated_data/precomputed_max.csv'],
+        'inputs': ['scripts/min_max_columns.py', *SHARED_SOURCES],
+        'sources': RAW_WVS_SOURCES,
+        'module': 'scripts.min_max_columns',
+        'workers': True,
+    },
+    'precomputed_ci': {
+        'outputs': ['precalculated_data/precomputed_env_ci.csv', 'precalculated_data/precomputed_age_ci.csv'],
+        'inputs': ['scripts/precompute_confidence_intervals.py', 'scripts/manifest.py', *SHARED_SOURCES],
+        'sources': RAW_WVS_SOURCES,
+        'module': 'scripts.precompute_confidence_intervals',
+    },
+    'results_cube': {
+        'outputs': ['precalculated_data/results_cube.parquet'],
+        'inputs': ['precalculated_data/precomputed_env_data.csv', 'precalculated_data/precomputed_age_data.csv',
+                   'scripts/precompute_results_cube.py', 'dashboard/cube.py'],
+        'optional_inputs': ['precalculated_data/precomputed_env_ci.csv', 'precalculated_data/precomputed_age_ci.csv'],
+        'module': 'scripts.precompute_results_cube',
+    },
+    'tax_summary': {
+        'outputs': ['precalculated_data/tax_summary.csv'],
+        'inputs': ['data/raw_tax_data.csv', 'scripts/precalculated_tax_data.py'],
+        'module': 'scripts.precalculated_tax_data',
+    },
+    'co2_data': {
+        'outputs': ['precalculated_data/co2_per_capita.parquet'],
+        'inputs': ['scripts/precompute_co2_data.py', 'dashboard/schema.py'],
+        'sources': ['data/co2-data.csv', 'precalculated_data/co2-data.csv'],
+        'module': 'scripts.precompute_co2_data',
+    },
+    'header_images': {
+        'outputs': header_variants(),
+        'inputs': [HEADER_SOURCE, 'scripts/build_header_images.py', 'dashboard/assets.py'],
+        'module': 'scripts.build_header_images',
+    },
+    'carbon_pricing': {
+        'outputs': ['precalculated_data/carbon_pricing.csv'],
+        'inputs': ['scripts/carbon_tax.py'],
+        'module': 'scripts.carbon_tax',
+    },
+}
+
+# The Parquet cache is optional: the WVS steps read the raw CSV when it is missing.
+# Without confidence intervals the results cube is built with point estimates only.
+OPTIONAL_STEPS = {'parquet_cache', 'precomputed_ci'}
+
+
+def step_inputs(name):
+    step = STEPS[name]
+    return step['inputs'] + step.get('sources', []) + step.get('optional_inputs', [])
+
+
+def producers():
+    """Map each output file to the step that makes it."""
+    return {output: name for name, step in STEPS.items() for output in step['outputs']}
+
+
+def dependencies(name):
+    """Steps whose outputs are inputs of `name`."""
+    made_by = producers()
+    return [made_by[path] for path in step_inputs(name) if path in made_by]
+
+
+def required_steps(targets):
+    """`targets` and everything they depend on."""
+    required, pending = set(), list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in required:
+            required.add(name)
+            pending.extend(dependencies(name))
+    return required
+
+
+def is_up_to_date(name, rebuilt):
+    """True when all outputs exist, no dependency was rebuilt in this run and no input is newer."""
+    step = STEPS[name]
+    if not all(os.path.exists(path) for path in step['outputs']) or any(dep in rebuilt for dep in dependencies(name)):
+        return False
+    output_mtime = min(os.stat(path).st_mtime_ns for path in step['outputs'])
+    return all(os.stat(path).st_mtime_ns <= output_mtime for path in step_inputs(name) if os.path.exists(path))
+
+
+def missing_inputs(name, planned=()):
+    """
+    Inputs of `name` that are not on disk (checked once its dependencies have run); the
+    `planned` outputs of steps a dry run would have run count as present.
+    """
+    def exists(path):
+        return path in planned or os.path.exists(path)
+
+    step = STEPS[name]
+    missing = [path for path in step['inputs'] if not exists(path)]
+    if step.get('sources') and not any(exists(path) for path in step['sources']):
+        missing.append(' or '.join(step['sources']))
+    return missing
+
+
+def run_step(name, workers):
+    step = STEPS[name]
+    command = [sys.executable, '-m', step['module']]
+    if step.get('workers'):
+        command += ['--workers', str(workers)]
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Step '{name}' failed:\n{result.stdout}{result.stderr}")
+    return elapsed
+
+
+def build(targets, force=False, jobs=2, workers=1, dry_run=False):
+    """
+    Bring the outputs of `targets` up to date, running independent steps concurrently.
+    Returns the names of the steps that ran and of those that failed or could not run; a
+    step whose dependency failed is not run and counts as failed.
+    """
+    required = required_steps(targets)
+    done, rebuilt, failed, running = set(), set(), set(), {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while len(done) < len(required):
+            for name in sorted(required - done - set(running.values())):
+                if not all(dep in done for dep in dependencies(name)):
+                    continue
+                failed_deps = sorted(dep for dep in dependencies(name) if dep in failed)
+                if failed_deps:
+                    # Its inputs would be missing or stale
+                    print(f"[not run] {name}: {', '.join(failed_deps)} failed")
+                    failed.add(name)
+                    done.add(name)
+                    continue
+                # A dry run does not make the outputs of the steps it would run
+                planned = {path for dep in rebuilt for path in STEPS[dep]['outputs']} if dry_run else ()
+                missing = missing_inputs(name, planned)
+                if missing:
+                    if not all(os.path.exists(path) for path in STEPS[name]['outputs']) and name not in OPTIONAL_STEPS:
+                        print(f"[missing] {name}: needs {', '.join(missing)}")
+                        failed.add(name)
+                    else:
+                        print(f"[skip] {name}: {', '.join(missing)} not found")
+                    done.add(name)
+                elif not force and is_up_to_date(name, rebuilt):
+                    print(f"[up to date] {name}")
+                    done.add(name)
+                elif dry_run:
+                    print(f"[would run] {name}")
+                    done.add(name)
+                    rebuilt.add(name)
+                else:
+                    print(f"[run] {name}")
+                    running[pool.submit(run_step, name, workers)] = name
+
+            if running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    done.add(name)
+                    try:
+                        print(f"[done] {name} ({future.result():.1f}s)")
+                        rebuilt.add(name)
+                    except RuntimeError as error:
+                        print(f"[failed] {error}")
+                        failed.add(name)
+
+    return rebuilt, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build the files in precalculated_data/, skipping up-to-date steps.")
+    parser.add_argument('targets', nargs='*', help=f"Steps to build (default: all): {', '.join(STEPS)}")
+    parser.add_argument('--force', action='store_true', help="Rebuild even if outputs are up to date")
+    parser.add_argument('--jobs', type=int, default=2, help="Steps to run at the same time (default: 2)")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes per WVS precompute step")
+    parser.add_argument('--dry-run', action='store_true', help="Only print which steps would run")
+    args = parser.parse_args()
+    unknown = [target for target in args.targets if target not in STEPS]
+    if unknown:
+        parser.error(f"unknown steps: {', '.join(unknown)}")
+
+    _, failed = build(args.targets or list(STEPS), force=args.force, jobs=args.jobs, workers=args.workers,
+                      dry_run=args.dry_run)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,32 @@
+import os
+
+from PIL import Image
+from dashboard.assets import HEADER_DIR, HEADER_FORMATS, HEADER_SOURCE, HEADER_WIDTHS, header_variant
+
+# Encoder settings: WebP for current browsers, a progressive JPEG for the rest
+SAVE_OPTIONS = {
+    'WEBP': {'quality': 80, 'method': 6},
+    'JPEG': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def main():
+    os.makedirs(HEADER_DIR, exist_ok=True)
+    with Image.open(HEADER_SOURCE) as image:
+        # Let the JPEG decoder scale down as far as it can while staying above the largest copy
+        width = max(HEADER_WIDTHS)
+        image.draft('RGB', (width, round(image.height * width / image.width)))
+        icc_profile = image.info.get('icc_profile')
+        source = image.convert('RGB')
+
+    for width in sorted(HEADER_WIDTHS, reverse=True):
+        height = round(source.height * width / source.width)
+        resized = source.resize((width, height), Image.LANCZOS)
+        for extension, image_format in HEADER_FORMATS.items():
+            path = header_variant(width, extension)
+            resized.save(path, format=image_format, icc_profile=icc_profile, **SAVE_OPTIONS[image_format])
+            print(f"{path}: {width}x{height}, {os.path.getsize(path) / 1024:.0f} KB")
+
+
+if __name__ == '__main__':
+    main()
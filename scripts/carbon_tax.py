@@ -42,5 +42,5 @@ data = [
 df = pd.DataFrame(data)
 
 # Save to CSV
-file_path = 'carbon_pricing.csv'
+file_path = 'precalculated_data/carbon_pricing.csv'
 df.to_csv(file_path, index=False)
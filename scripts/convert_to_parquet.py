@@ -0,0 +1,40 @@
+import json
+import os
+import shutil
+
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+from scripts.ingest import PARQUET_CACHE_PATH, PARQUET_SOURCE_FILE, PARTITION_SCHEMA, RAW_DATA_PATH, csv_column_types, source_stamp
+
+# Stamp the raw CSV before reading it, so a file replaced mid-conversion leaves the cache stale
+stamp = source_stamp(RAW_DATA_PATH)
+
+# Stream the CSV in large blocks, with every column's type declared rather than inferred
+reader = pv.open_csv(
+    RAW_DATA_PATH,
+    read_options=pv.ReadOptions(block_size=64 << 20),
+    convert_options=pv.ConvertOptions(column_types=csv_column_types(RAW_DATA_PATH))
+)
+
+# Rebuild the cache from scratch so partitions dropped from the CSV do not linger
+if os.path.exists(PARQUET_CACHE_PATH):
+    shutil.rmtree(PARQUET_CACHE_PATH)
+
+# Write a compressed, columnar copy partitioned by wave and country
+ds.write_dataset(
+    reader,
+    PARQUET_CACHE_PATH,
+    format='parquet',
+    partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+    file_options=ds.ParquetFileFormat().make_write_options(compression='zstd'),
+    max_partitions=4096,
+    min_rows_per_group=100_000,
+    existing_data_behavior='overwrite_or_ignore',
+    use_threads=False  # Keep row order, so unchanged partitions hash the same after a reconversion
+)
+
+# Record which CSV the cache was built from; the scripts fall back to the CSV once it changes
+with open(os.path.join(PARQUET_CACHE_PATH, PARQUET_SOURCE_FILE), 'w') as f:
+    json.dump(stamp, f)
+
+print(f"Parquet cache of '{RAW_DATA_PATH}' saved to '{PARQUET_CACHE_PATH}'.")
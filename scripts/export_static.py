@@ -0,0 +1,194 @@
+import argparse
+import html
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from dashboard import datasets
+from dashboard.cube import YOUTH_AGE_GROUP
+from dashboard.figures import carbon_pricing_map, co2_figure, epi_figure, trend_figure, youth_figure
+from mappings.country_registry import countries
+
+# Pre-render the app's charts for the default countries into static files: Step 1 for every
+# question, Step 2 for every question and wave, and the CO₂, carbon pricing and EPI charts.
+# Each view is an HTML page and the figure's JSON; all pages load one shared plotly.min.js,
+# so the export can be served by any static file server. Views of a dataset that is missing
+# or broken are left out with a warning; the others, the index and the manifest are written.
+# Run from the repository root: python -m scripts.export_static --output export --workers 4
+
+OUTPUT_DIR = 'export'
+VIEWS_DIR = 'views'
+PLOTLY_JS = 'plotly.min.js'
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<script src="../{plotly_js}"></script>
+</head>
+<body>
+<p><a href="../index.html">All charts</a></p>
+<h2>{title}</h2>
+{chart}
+</body>
+</html>
+"""
+
+INDEX = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>Youth, Environment, and Action: Insights from Global Data</title>
+</head>
+<body>
+<h1>Youth, Environment, and Action: Insights from Global Data</h1>
+<p>Countries: {countries}</p>
+{sections}
+</body>
+</html>
+"""
+
+# Datasets read by each worker process, on its first view that needs them (or the
+# DatasetError they raised, so a missing file is not looked for again by every view)
+_datasets = {}
+
+
+def _dataset(name):
+    if name not in _datasets:
+        try:
+            _datasets[name] = datasets.load(name)
+        except datasets.DatasetError as error:
+            _datasets[name] = error
+    if isinstance(_datasets[name], datasets.DatasetError):
+        raise _datasets[name]
+    return _datasets[name]
+
+
+def _warn(error):
+    print(f"[skipped] {error}", flush=True)
+
+
+def views():
+    """Every view to export: (file name, title, chart builder name, arguments)."""
+    result = []
+    try:
+        results_cube = _dataset('results_cube')
+    except datasets.DatasetError as error:
+        _warn(f"Steps 1 and 2: {error}")
+    else:
+        for question, label in datasets.question_options(results_cube).items():
+            result.append((f'trend_{question}', label, 'trend', (question, tuple(results_cube.waves()))))
+            for wave in results_cube.waves(YOUTH_AGE_GROUP):
+                result.append((f'youth_{question}_wave_{wave}', f"{label} (under 29, wave {wave})", 'youth',
+                               (question, wave)))
+    result += [
+        ('co2', "CO₂ emissions per capita, 1981–2023", 'co2', ()),
+        ('carbon_pricing', "Carbon pricing instruments", 'carbon_pricing', ()),
+        ('epi', "Environmental Performance Index (EPI), 2024", 'epi', ()),
+    ]
+    return result
+
+
+def build_figure(chart, args):
+    """The figure app.py draws for `chart` with the default countries (None without data); raises DatasetError."""
+    default_countries = datasets.DEFAULT_COUNTRIES
+    if chart == 'trend':
+        question, waves = args
+        return trend_figure(_dataset('results_cube'), question, default_countries, list(waves))
+    if chart == 'youth':
+        question, wave = args
+        return youth_figure(_dataset('results_cube'), question, default_countries, wave)
+    if chart == 'co2':
+        return co2_figure(_dataset('co2_data'), default_countries)
+    if chart == 'carbon_pricing':
+        return carbon_pricing_map(_dataset('tax_data'))
+    return epi_figure(_dataset('epi_data'), default_countries)
+
+
+def render(output, shard):
+    """
+    Write the views of `shard`; returns the (name, title) of those that have data, and the
+    messages of the datasets that could not be loaded.
+    """
+    written, errors = [], []
+    for name, title, chart, args in shard:
+        try:
+            fig = build_figure(chart, args)
+        except datasets.DatasetError as error:
+            if str(error) not in errors:
+                errors.append(str(error))
+            continue
+        if fig is None:
+            continue
+        path = os.path.join(output, VIEWS_DIR, name)
+        with open(f'{path}.json', 'w') as f:
+            f.write(fig.to_json())
+        with open(f'{path}.html', 'w', encoding='utf-8') as f:
+            f.write(PAGE.format(title=html.escape(title), plotly_js=PLOTLY_JS,
+                                chart=fig.to_html(full_html=False, include_plotlyjs=False)))
+        written.append((name, title))
+    return written, errors
+
+
+def write_index(output, written):
+    titles = dict(written)
+    groups = [
+        ("Step 1: World trends", [name for name in titles if name.startswith('trend_')]),
+        ("Step 2: Youth responses", [name for name in titles if name.startswith('youth_')]),
+        ("Steps 3 to 5", [name for name in ('co2', 'carbon_pricing', 'epi') if name in titles]),
+    ]
+    sections = []
+    for heading, names in groups:
+        links = ''.join(f'<li><a href="{VIEWS_DIR}/{name}.html">{html.escape(titles[name])}</a></li>\n' for name in names)
+        sections.append(f'<h2>{heading}</h2>\n<ul>\n{links}</ul>')
+    with open(os.path.join(output, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(INDEX.format(countries=html.escape(', '.join(countries.names_of(datasets.DEFAULT_COUNTRIES))),
+                             sections='\n'.join(sections)))
+    with open(os.path.join(output, 'manifest.json'), 'w') as f:
+        json.dump({'countries': datasets.DEFAULT_COUNTRIES,
+                   'views': [{'name': name, 'title': title, 'html': f'{VIEWS_DIR}/{name}.html',
+                              'json': f'{VIEWS_DIR}/{name}.json'} for name, title in written]}, f, indent=2)
+
+
+def export(output=OUTPUT_DIR, workers=1):
+    """Render every view into `output`; returns the number of views written."""
+    from plotly.offline import get_plotlyjs
+
+    os.makedirs(os.path.join(output, VIEWS_DIR), exist_ok=True)
+    with open(os.path.join(output, PLOTLY_JS), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    all_views = views()
+    if workers <= 1:
+        written, errors = render(output, all_views)
+    else:
+        # Round-robin, so every worker gets some of each kind of chart
+        shards = [all_views[i::workers] for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(render, [output] * len(shards), shards))
+        written = [view for shard_written, _ in results for view in shard_written]
+        errors = list(dict.fromkeys(error for _, shard_errors in results for error in shard_errors))
+        order = {view[0]: i for i, view in enumerate(all_views)}
+        written.sort(key=lambda view: order[view[0]])
+    for error in errors:
+        _warn(error)
+    write_index(output, written)
+    return len(written)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render the app's charts into static HTML and JSON files.")
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f"Output folder (default: {OUTPUT_DIR})")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes (default: 1, run serially)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    count = export(args.output, args.workers)
+    print(f"{count} views exported to '{args.output}' in {time.perf_counter() - start:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
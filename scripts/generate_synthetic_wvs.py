@@ -0,0 +1,125 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+from mappings.country_mapping import country_info
+from mappings.variable_mappings_env import variable_mappings
+
+# Write a synthetic stand-in for the WVS time-series (data/data.csv) with the columns the
+# precompute scripts read, for benchmarks and load tests where the licensed data is unavailable.
+# Run from the repository root: python -m scripts.generate_synthetic_wvs --output data/data.csv
+
+OUTPUT_PATH = 'data/data.csv'
+WAVES = [1, 2, 3, 4, 5, 6, 7]
+
+# Like the real file, not every country took part in every wave, sample sizes vary around
+# 1,200 per country and wave, and some questions were not asked in some surveys
+DEFAULT_COUNTRIES = 110
+DEFAULT_RESPONDENTS = 1200
+DEFAULT_COVERAGE = 0.55
+NOT_ASKED_SHARE = 0.25
+
+# Negative WVS codes: -1 don't know, -2 no answer, -4 not asked in survey, -5 missing
+NON_RESPONSE_CODES = [-1, -2, -5]
+NON_RESPONSE_SHARES = [0.04, 0.02, 0.01]
+NOT_ASKED = -4
+
+# X003R2 age groups: 1 = 15-29, 2 = 30-49, 3 = 50 and more
+AGE_GROUPS = [1, 2, 3, -5]
+AGE_SHARES = [0.28, 0.38, 0.32, 0.02]
+
+# Answer codes: B001-B003 agree strongly (1) to disagree strongly (4); B008 protecting the
+# environment (1), economic growth (2), other answer (3)
+SCALE_CODES = np.array([1, 2, 3, 4])
+SCALE_SHARES = np.array([0.2, 0.35, 0.3, 0.15])
+B008_OTHER_SHARE = 0.05
+YOUTH_SHIFT = 0.15  # Under 30s answer a bit more in favour of the environment
+
+
+def _answers(rng, variable, attitude, age_groups):
+    """Answer codes of one country and wave; `attitude` > 0 leans towards the favourable codes."""
+    size = len(age_groups)
+    shift = attitude + YOUTH_SHIFT * (age_groups == 1)
+    if variable == 'B008':
+        favourable = 1 / (1 + np.exp(-shift))
+        codes = np.where(rng.random(size) < favourable, 1, 2)
+        codes[rng.random(size) < B008_OTHER_SHARE] = 3
+    else:
+        # Tilt the scale towards the low (agreeing) codes, per respondent
+        weights = SCALE_SHARES * np.exp(-np.outer(shift, SCALE_CODES - 2.5))
+        cumulative = np.cumsum(weights / weights.sum(axis=1, keepdims=True), axis=1)
+        codes = SCALE_CODES[(rng.random((size, 1)) > cumulative).sum(axis=1)]
+    missing = rng.random(size)
+    for code, threshold in zip(NON_RESPONSE_CODES, np.cumsum(NON_RESPONSE_SHARES)):
+        codes = np.where((missing < threshold) & (codes > 0), code, codes)
+    return codes
+
+
+def survey(rng, country, wave, respondents, variables, extra_columns):
+    """Respondents of one country and wave."""
+    size = int(rng.integers(int(respondents * 0.7), int(respondents * 1.3) + 1))
+    age_groups = rng.choice(AGE_GROUPS, size, p=AGE_SHARES)
+    weights = rng.lognormal(0, 0.35, size)
+    data = {
+        'S002VS': np.full(size, wave),
+        'COUNTRY_ALPHA': np.full(size, country),
+        'X003R2': age_groups,
+        'S017': (weights / weights.mean()).round(6),
+    }
+    attitude = rng.normal(0, 0.6)
+    for variable in variables:
+        if rng.random() < NOT_ASKED_SHARE:
+            data[variable] = np.full(size, NOT_ASKED)
+        else:
+            data[variable] = _answers(rng, variable, attitude + rng.normal(0, 0.2), age_groups)
+    for i in range(extra_columns):
+        data[f'V{i:04d}'] = rng.integers(-2, 11, size)
+    return pd.DataFrame(data)
+
+
+def generate(path=OUTPUT_PATH, countries=DEFAULT_COUNTRIES, waves=WAVES, respondents=DEFAULT_RESPONDENTS,
+             coverage=DEFAULT_COVERAGE, extra_columns=0, seed=0):
+    """Write the synthetic file one survey at a time, so memory stays flat; returns the number of rows."""
+    rng = np.random.default_rng(seed)
+    codes = [info['country_3'] for info in country_info]
+    chosen = sorted(rng.choice(codes, min(countries, len(codes)), replace=False))
+    variables = [next(iter(item)) for item in variable_mappings]
+
+    rows = 0
+    for wave in waves:
+        for country in chosen:
+            if rng.random() >= coverage:
+                continue
+            data = survey(rng, country, wave, respondents, variables, extra_columns)
+            data.to_csv(path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(data)
+    return rows
+
+
+def respondents_for(rows, countries=DEFAULT_COUNTRIES, waves=WAVES, coverage=DEFAULT_COVERAGE):
+    """Respondents per survey that give about `rows` rows in total."""
+    return max(1, round(rows / (min(countries, len(country_info)) * len(waves) * coverage)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic WVS-shaped data.csv.")
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    parser.add_argument('--countries', type=int, default=DEFAULT_COUNTRIES, help="Number of countries")
+    parser.add_argument('--waves', type=int, nargs='+', default=WAVES)
+    parser.add_argument('--respondents', type=int, default=DEFAULT_RESPONDENTS,
+                        help="Average respondents per country and wave")
+    parser.add_argument('--rows', type=int, help="Approximate total rows (overrides --respondents)")
+    parser.add_argument('--coverage', type=float, default=DEFAULT_COVERAGE,
+                        help="Share of country x wave combinations that have a survey")
+    parser.add_argument('--extra-columns', type=int, default=0,
+                        help="Unused answer columns to add (the real file has about 1,000)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    respondents = respondents_for(args.rows, args.countries, args.waves, args.coverage) if args.rows else args.respondents
+    rows = generate(args.output, args.countries, args.waves, respondents, args.coverage, args.extra_columns, args.seed)
+    print(f"Synthetic WVS data ({rows:,} rows) saved to '{args.output}'.")
+
+
+if __name__ == '__main__':
+    main()
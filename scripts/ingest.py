@@ -0,0 +1,139 @@
+import csv
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from mappings.variable_mappings_env import variable_mappings
+
+# Location of the raw WVS time-series and how many rows are parsed at a time
+RAW_DATA_PATH = 'data/data.csv'
+CHUNK_SIZE = 100_000
+
+# Columnar copy of the raw data written by scripts/convert_to_parquet.py
+PARQUET_CACHE_PATH = 'data/parquet'
+PARQUET_SOURCE_FILE = '_source.json'  # Leading underscore keeps it out of the dataset
+PARTITION_SCHEMA = pa.schema([('S002VS', pa.int64()), ('COUNTRY_ALPHA', pa.string())])
+
+# Country codes stay strings; waves, age groups and answer codes fit in small nullable integers
+COLUMN_DTYPES = {
+    'COUNTRY_ALPHA': 'string',
+    'S002VS': 'Int8',
+    'X003R2': 'Int8',
+    'S017': 'float64',
+}
+ANSWER_DTYPE = 'Int16'
+
+
+def csv_column_types(path=RAW_DATA_PATH):
+    """
+    Arrow type of every column of the raw CSV, for reading it with pyarrow.
+
+    Declared for all columns from the header: pyarrow infers the others from the first block
+    and fails when a later block does not fit, e.g. S017 being 1 in every early survey or a
+    question left blank in the early waves. The columns the scripts read as numbers (weight,
+    age group, the question codes of variable_mappings) are float64, the partition keys
+    have their partition types and every other column is text, since the file also holds
+    identifiers such as version ('4-0-0'), doi and COW_ALPHA.
+    """
+    numeric = ({column for column, dtype in COLUMN_DTYPES.items() if dtype != 'string'}
+               | {code for item in variable_mappings for code in item})
+    with open(path, newline='') as f:
+        header = next(csv.reader(f))
+    types = {column: pa.float64() if column in numeric else pa.string() for column in header}
+    types.update({field.name: field.type for field in PARTITION_SCHEMA})
+    return types
+
+
+def source_stamp(path=RAW_DATA_PATH):
+    """Size and modification time of the raw CSV, used to tell whether the Parquet cache is stale."""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def cache_is_fresh(path=RAW_DATA_PATH, cache_path=PARQUET_CACHE_PATH):
+    """True when the Parquet cache exists and was built from the current raw CSV (or the CSV is gone)."""
+    stamp_file = os.path.join(cache_path, PARQUET_SOURCE_FILE)
+    if not os.path.exists(stamp_file):
+        return False
+    if not os.path.exists(path):
+        return True
+    with open(stamp_file) as f:
+        return json.load(f) == source_stamp(path)
+
+
+def open_cache(cache_path=PARQUET_CACHE_PATH):
+    """Open the Parquet cache as a dataset partitioned by wave and country."""
+    return ds.dataset(cache_path, format='parquet', partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'))
+
+
+def available_columns(path=RAW_DATA_PATH):
+    """Column names of the raw data, read from the Parquet schema or the CSV header."""
+    if cache_is_fresh(path):
+        return open_cache().schema.names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def _dtypes(columns):
+    # Any column without a declared dtype is an answer code
+    return {column: COLUMN_DTYPES.get(column, ANSWER_DTYPE) for column in columns}
+
+
+def _parse_dtypes(dtypes):
+    # The CSV parser is much slower at filling nullable integers directly, so numbers are
+    # parsed as float32 and narrowed to the compact dtypes afterwards
+    return {column: 'float32' if dtype.startswith('Int') else dtype for column, dtype in dtypes.items()}
+
+
+def _filter_expression(filters):
+    expression = None
+    for column, values in filters.items():
+        condition = ds.field(column).isin(list(values))
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_chunks(columns, path=RAW_DATA_PATH, chunksize=CHUNK_SIZE, filters=None):
+    """
+    Yield the raw data in chunks of at most `chunksize` rows, holding only `columns`.
+
+    `filters` maps a column to the values to keep, e.g. {'S002VS': [7]}. When the Parquet
+    cache is fresh, only the requested columns of the matching wave/country partitions are
+    read from disk; otherwise the CSV is parsed and filtered chunk by chunk.
+    """
+    columns = list(columns)
+    dtypes = _dtypes(columns)
+
+    if cache_is_fresh(path):
+        scanner = open_cache().scanner(columns=columns, filter=_filter_expression(filters or {}),
+                                       batch_size=chunksize)
+        # Partitions are small, so gather record batches until a full chunk is buffered
+        batches, rows = [], 0
+        for batch in scanner.to_batches():
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= chunksize:
+                yield pa.Table.from_batches(batches).to_pandas().astype(dtypes)
+                batches, rows = [], 0
+        if rows:
+            yield pa.Table.from_batches(batches).to_pandas().astype(dtypes)
+        return
+
+    for chunk in pd.read_csv(path, usecols=columns, dtype=_parse_dtypes(dtypes), chunksize=chunksize):
+        for column, values in (filters or {}).items():
+            chunk = chunk[chunk[column].isin(list(values))]
+        if len(chunk):
+            yield chunk.astype(dtypes)
+
+
+def aggregate(columns, partial, merge, path=RAW_DATA_PATH, chunksize=CHUNK_SIZE, filters=None):
+    """
+    Stream the raw data through `partial` chunk by chunk and fold the partial results
+    together with `merge`, so only one chunk and the running aggregate are held in memory.
+    """
+    result = None
+    for chunk in read_chunks(columns, path=path, chunksize=chunksize, filters=filters):
+        part = partial(chunk)
+        result = part if result is None else merge([result, part])
+    return result
@@ -0,0 +1,165 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+from scripts import aggregation, ingest, parallel
+from scripts.aggregation import KEY_COLUMNS, WEIGHT_COLUMN, favorable_codes, merge_counts, partial_counts
+from scripts.ingest import RAW_DATA_PATH, available_columns, cache_is_fresh, open_cache
+from scripts.parallel import sharded_aggregate
+
+# Counts from the last run and the manifest describing which inputs they were computed from
+STATE_PATH = 'data/precompute_state'
+MANIFEST_FILE = 'manifest.json'
+COUNTS_FILE = 'counts.parquet'
+
+# Partition key used when there is no Parquet cache and the whole CSV is one input
+WHOLE_FILE = '*'
+
+
+def _file_digest(paths):
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def script_version():
+    """
+    Hash of the code the counts come from: a change to how the data is read (columns,
+    dtypes, partitions), split or counted invalidates everything.
+    """
+    return _file_digest([aggregation.__file__, ingest.__file__, parallel.__file__])
+
+
+def variable_specs(env_vars):
+    """Hash of what defines each variable's counts (its favorable answer codes)."""
+    return {var: hashlib.sha256(json.dumps(favorable_codes(var)).encode()).hexdigest() for var in env_vars}
+
+
+def input_partitions(previous=None):
+    """
+    Content hash of every (country, wave) partition of the Parquet cache, or of the whole CSV
+    when there is no cache. Files whose size and mtime match `previous` are not re-read.
+    """
+    previous = previous or {}
+    groups = {}
+    if cache_is_fresh():
+        for fragment in open_cache().get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            # Rows without a country or wave never make it into the outputs
+            if keys.get('COUNTRY_ALPHA') is None or keys.get('S002VS') is None:
+                continue
+            groups.setdefault(f"{keys['COUNTRY_ALPHA']}/{keys['S002VS']}", []).append(fragment.path)
+    else:
+        groups[WHOLE_FILE] = [RAW_DATA_PATH]
+
+    partitions = {}
+    for key, paths in groups.items():
+        files = {path: [os.stat(path).st_size, os.stat(path).st_mtime_ns] for path in sorted(paths)}
+        known = previous.get(key)
+        digest = known['digest'] if known and known['files'] == files else _file_digest(paths)
+        partitions[key] = {'files': files, 'digest': digest}
+    return partitions
+
+
+def load_state():
+    """The manifest and counts of the last run, or (None, None) when there are none."""
+    manifest_path = os.path.join(STATE_PATH, MANIFEST_FILE)
+    counts_path = os.path.join(STATE_PATH, COUNTS_FILE)
+    if not (os.path.exists(manifest_path) and os.path.exists(counts_path)):
+        return None, None
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    return manifest, pd.read_parquet(counts_path)
+
+
+def save_state(manifest, counts):
+    # Write to temporary files first so an interrupted run never leaves a mismatched pair
+    os.makedirs(STATE_PATH, exist_ok=True)
+    counts_path = os.path.join(STATE_PATH, COUNTS_FILE)
+    manifest_path = os.path.join(STATE_PATH, MANIFEST_FILE)
+    counts.to_parquet(counts_path + '.tmp')
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(counts_path + '.tmp', counts_path)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def count_key_columns():
+    """Columns read besides the variables: the grouping keys and, when present, the survey weight."""
+    return KEY_COLUMNS + ([WEIGHT_COLUMN] if WEIGHT_COLUMN in available_columns() else [])
+
+
+def _count_columns(variables):
+    return [f'{var}_{kind}' for var in variables for kind in ('total', 'favorable')]
+
+
+def _partition_pairs(counts):
+    # (country, wave) of every row of a counts table
+    return pd.MultiIndex.from_arrays([
+        counts.index.get_level_values(0),
+        counts.index.get_level_values(1).astype('int64')
+    ])
+
+
+def incremental_counts(env_vars, workers=1):
+    """
+    Favorable/total counts for `env_vars`, recomputing only what changed since the last run.
+
+    Variables that are new or whose spec changed are counted over all data, (country, wave)
+    partitions that are new or whose content changed are recounted for all variables, and
+    removed ones are dropped. A change to the reading or counting code recomputes everything.
+    """
+    manifest, counts = load_state()
+    key_columns = count_key_columns()
+    partitions = input_partitions(manifest and manifest['partitions'])
+    specs = variable_specs(env_vars)
+
+    stale = None  # Recompute everything
+    if manifest is not None and manifest['version'] == script_version():
+        stale = {key for key in set(partitions) | set(manifest['partitions'])
+                 if manifest['partitions'].get(key, {}).get('digest') != partitions.get(key, {}).get('digest')}
+        # Without the Parquet cache there is no partition-level information to go on
+        if WHOLE_FILE in stale:
+            stale = None
+
+    if stale is None:
+        print("Computing counts for all variables and partitions.")
+        counts = sharded_aggregate(key_columns, env_vars, partial_counts, merge_counts, workers=workers)
+    else:
+        # Keep the variables whose spec is unchanged and count the others over all data
+        kept = [var for var in env_vars if manifest['variables'].get(var) == specs[var]]
+        counts = counts[_count_columns(kept)]
+        added = [var for var in env_vars if var not in kept]
+        if added:
+            print(f"Computing counts for new or changed variables: {', '.join(added)}")
+            new_counts = sharded_aggregate(key_columns, added, partial_counts, merge_counts, workers=workers)
+            # Stacked and summed rather than joined: a join would match rows without an age
+            # group (NaN X003R2) to each other more than once and count them twice
+            counts = merge_counts([counts, new_counts]).fillna(0).astype('int64')
+
+        # Replace the counts of changed partitions, drop those of removed ones
+        if stale:
+            print(f"Recomputing {len(stale)} changed (country, wave) partitions.")
+            stale_pairs = pd.MultiIndex.from_tuples([(key.split('/')[0], int(key.split('/')[1])) for key in stale])
+            counts = counts[~_partition_pairs(counts).isin(stale_pairs)]
+
+            changed = [key for key in stale if key in partitions]
+            if changed:
+                filters = {
+                    'COUNTRY_ALPHA': sorted({key.split('/')[0] for key in changed}),
+                    'S002VS': sorted({int(key.split('/')[1]) for key in changed}),
+                }
+                fresh = sharded_aggregate(key_columns, env_vars, partial_counts, merge_counts,
+                                          workers=workers, filters=filters)
+                if fresh is not None:
+                    # The filters select a cross product of countries and waves, keep only changed cells
+                    fresh = fresh[_partition_pairs(fresh).isin(stale_pairs)]
+                    counts = merge_counts([counts, fresh[_count_columns(env_vars)]])
+
+    save_state({'version': script_version(), 'variables': specs, 'partitions': partitions}, counts)
+    return counts
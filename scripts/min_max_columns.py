@@ -1,42 +1,46 @@
-import pandas as pd
 from mappings.variable_mappings_env import variable_mappings  # Ensure this file contains the question mappings
+from scripts.aggregation import KEY_COLUMNS, merge_max, partial_max
+from scripts.ingest import available_columns
+from scripts.parallel import parse_args, sharded_aggregate
 
 # Load question mappings for all questions
 question_options = {list(item.keys())[0]: list(item.values())[0] for item in variable_mappings}
 
-# Load the data
-data = pd.read_csv('data/data.csv')  # Updated path to match your specified file location
+OUTPUT_PATH = 'precalculated_data/precomputed_max.csv'
 
-# Replace invalid values with NaN for existing questions in the dataset and verify numeric columns
-valid_columns = {}
-for question_code in question_options.keys():
-    if question_code in data.columns:
-        # Skip all columns that start with "S", "V", "W", "X", "Y", or "M"
-        if question_code.startswith(("S", "V", "W", "X", "Y", "M")):
-            print(f"Skipping column with prefix 'S', 'V', 'W', 'X', 'Y', or 'M': {question_code}")
-            continue
 
-        # Replace invalid values with NaN
-        data[question_code] = data[question_code].apply(lambda x: x if x > 0 else pd.NA)
+def valid_columns():
+    """Questions present in the data, leaving out survey/admin columns."""
+    # Only read the columns of existing questions from the data
+    data_columns = set(available_columns())
 
-        # Try converting to numeric; handle any exceptions
-        try:
-            # Convert to numeric
-            data[question_code] = pd.to_numeric(data[question_code])
+    columns = []
+    for question_code in question_options.keys():
+        if question_code in data_columns:
+            # Skip all columns that start with "S", "V", "W", "X", "Y", or "M"
+            if question_code.startswith(("S", "V", "W", "X", "Y", "M")):
+                print(f"Skipping column with prefix 'S', 'V', 'W', 'X', 'Y', or 'M': {question_code}")
+                continue
+            columns.append(question_code)
+    return columns
 
-            # Add mean, min, and max aggregations
-            valid_columns[question_code] = ['max']
-        except (ValueError, TypeError):
-            print(f"Skipping problematic column: {question_code}")
 
-# Group by country and wave, calculate mean, min, and max for valid questions
-mean_data = data.groupby(['COUNTRY_ALPHA', 'S002VS']).agg(valid_columns)
+def main(workers=1):
+    # Group by country and wave, calculate the max of valid answers chunk by chunk
+    mean_data = sharded_aggregate(KEY_COLUMNS[:2], valid_columns(), partial_max, merge_max, workers=workers)
 
-# Flatten the column names
-mean_data.columns = ['_'.join(col).strip() for col in mean_data.columns.values]
-mean_data.reset_index(inplace=True)
+    # Answer codes are read as small integers; keep the float output of the original script
+    mean_data = mean_data.sort_index().astype('float64')
 
-# Save the mean, min, and max values into a CSV file
-mean_data.to_csv('precomputed_max.csv', index=False)
+    # Flatten the column names
+    mean_data.columns = [f'{column}_max' for column in mean_data.columns]
+    mean_data.reset_index(inplace=True)
 
-print("Precomputed means, min, and max saved to 'precomputed_means_with_min_max.csv'.")
+    # Save the mean, min, and max values into a CSV file
+    mean_data.to_csv(OUTPUT_PATH, index=False)
+
+    print(f"Precomputed max values saved to '{OUTPUT_PATH}'.")
+
+
+if __name__ == '__main__':
+    main(parse_args("Precompute the max of valid answers per country and wave.").workers)
@@ -0,0 +1,62 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pyarrow.dataset as ds
+from scripts.ingest import aggregate, cache_is_fresh, open_cache
+
+
+def parse_args(description):
+    """Command line options shared by the precompute scripts."""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of worker processes (default: 1, run serially)")
+    return parser.parse_args()
+
+
+def country_shards(workers):
+    """Split the countries of the Parquet cache round-robin into at most `workers` shards."""
+    countries = sorted({
+        ds.get_partition_keys(fragment.partition_expression).get('COUNTRY_ALPHA')
+        for fragment in open_cache().get_fragments()
+    } - {None})
+    return [countries[i::workers] for i in range(min(workers, len(countries)))]
+
+
+def _aggregate_shard(key_columns, variables, partial, merge, filters):
+    # Runs in a worker: each shard reads its own columns/partitions from disk
+    return aggregate(key_columns + variables, partial=lambda chunk: partial(chunk, variables),
+                     merge=merge, filters=filters)
+
+
+def sharded_aggregate(key_columns, variables, partial, merge, workers=1, filters=None):
+    """
+    Run `partial(chunk, variables)` over the raw data and merge the results, optionally
+    across a pool of `workers` processes.
+
+    With a fresh Parquet cache the work is split by country: every worker reads only its
+    own country partitions, so no data is pickled between processes and the disjoint
+    results are merged with `merge`. Without the cache it runs in this process whatever
+    `workers` is: parsing the CSV is most of the work, and every worker would have to parse
+    all of it again. Convert the CSV with scripts/convert_to_parquet.py to use the workers.
+
+    `filters` restricts the rows read, as in scripts.ingest.read_chunks().
+    """
+    if workers <= 1 or not cache_is_fresh():
+        return _aggregate_shard(key_columns, variables, partial, merge, filters)
+
+    shards = []
+    for countries in country_shards(workers):
+        if filters and 'COUNTRY_ALPHA' in filters:
+            countries = [country for country in countries if country in set(filters['COUNTRY_ALPHA'])]
+        if countries:
+            shards.append({**(filters or {}), 'COUNTRY_ALPHA': countries})
+
+    if not shards:
+        return None
+
+    with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+        futures = [pool.submit(_aggregate_shard, key_columns, variables, partial, merge, shard_filters)
+                   for shard_filters in shards]
+        # Shards whose filters match no rows come back empty
+        parts = [part for part in (future.result() for future in futures) if part is not None]
+    return merge(parts) if parts else None
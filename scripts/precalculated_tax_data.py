@@ -53,6 +53,6 @@ summary_data = (
 summary_data.rename(columns={"Economy ISO3": "ISO3", "Economy Name": "Country"}, inplace=True)
 
 # Save the output
-output_file = "tax_summary.csv"
+output_file = "precalculated_data/tax_summary.csv"
 summary_data.to_csv(output_file, index=False)
 print(f"Summary data saved to {output_file}")
@@ -0,0 +1,43 @@
+import os
+
+import pandas as pd
+from dashboard.schema import CO2_DTYPES
+
+# The Our World in Data CO₂ file (https://github.com/owid/co2-data, ~80 columns from 1750 on)
+# cut down to what Step 3 draws: per-capita emissions of each country from 1981 to 2023,
+# typed and sorted by country and year so each country's series is one contiguous range.
+# The file used to be read by the app from precalculated_data/, which still works as a source.
+SOURCE_PATHS = ['data/co2-data.csv', 'precalculated_data/co2-data.csv']
+OUTPUT_PATH = 'precalculated_data/co2_per_capita.parquet'
+
+COLUMNS = ['iso_code', 'year', 'co2_per_capita']
+FIRST_YEAR, LAST_YEAR = 1981, 2023
+
+
+def source_path():
+    """The first of SOURCE_PATHS that exists, or None."""
+    return next((path for path in SOURCE_PATHS if os.path.exists(path)), None)
+
+
+def build(source, output=OUTPUT_PATH):
+    """Write the pruned table of `source` to `output`; returns the number of rows."""
+    data = pd.read_csv(source, usecols=COLUMNS, dtype={column: CO2_DTYPES[column] for column in COLUMNS})
+    # Regions and income groups have no ISO code (or an OWID_ one); only countries can be selected
+    data = data[data['iso_code'].notna() & ~data['iso_code'].str.startswith('OWID_', na=False) &
+                data['year'].between(FIRST_YEAR, LAST_YEAR)]
+    data = data.assign(iso_code=data['iso_code'].cat.remove_unused_categories())
+    data = data.sort_values(['iso_code', 'year'], ignore_index=True)
+    data.to_parquet(output, index=False, compression='zstd')
+    return len(data)
+
+
+def main():
+    source = source_path()
+    if source is None:
+        raise SystemExit(f"No CO₂ data: download owid-co2-data.csv to {SOURCE_PATHS[0]}")
+    rows = build(source)
+    print(f"CO₂ per capita for {rows} country-years saved to '{OUTPUT_PATH}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+import pandas as pd
+from dashboard.cube import YOUTH_AGE_GROUP
+from mappings.variable_mappings_env import variable_mappings  # Ensure this file contains the question mappings
+from scripts.aggregation import BOOTSTRAP_SEED, bootstrap_intervals
+from scripts.ingest import cache_is_fresh, read_chunks
+from scripts.manifest import count_key_columns
+
+# Load question mappings for all questions
+question_options = {list(item.keys())[0]: list(item.values())[0] for item in variable_mappings}
+
+# Variables to analyze
+env_vars = list(question_options.keys())
+
+ENV_OUTPUT_PATH = 'precalculated_data/precomputed_env_ci.csv'
+AGE_OUTPUT_PATH = 'precalculated_data/precomputed_age_ci.csv'
+
+
+def waves():
+    """The waves in the raw data, read from the wave column alone."""
+    found = set()
+    for chunk in read_chunks(['S002VS']):
+        found.update(int(wave) for wave in chunk['S002VS'].dropna().unique())
+    return sorted(found)
+
+
+def wave_data(columns):
+    """
+    Yield (wave, rows of that wave) for every wave of the raw data.
+
+    With a fresh Parquet cache each wave is read on its own from its partitions, so only one
+    wave is held in memory. Otherwise the CSV is parsed once, with its rows kept grouped by
+    wave: reading it again for every wave would parse the whole file each time.
+    """
+    if cache_is_fresh():
+        for wave in waves():
+            yield wave, pd.concat(read_chunks(columns, filters={'S002VS': [wave]}), ignore_index=True)
+        return
+
+    by_wave = {}
+    for chunk in read_chunks(columns):
+        for wave, rows in chunk.groupby('S002VS'):
+            by_wave.setdefault(int(wave), []).append(rows)
+    for wave in sorted(by_wave):
+        yield wave, pd.concat(by_wave.pop(wave), ignore_index=True)
+
+
+def main():
+    env_parts, age_parts = [], []
+    # One wave at a time; intervals are per country and wave, so they do not depend on the
+    # other waves. Only the key, weight and answer columns are read, as compact dtypes
+    for wave, data in wave_data(count_key_columns() + env_vars):
+        youth = data[data['X003R2'] == YOUTH_AGE_GROUP]
+
+        # Bootstrap confidence intervals of the weighted percentage favorable, all ages and under 29;
+        # every wave draws its own resamples
+        env_parts.append(bootstrap_intervals(data, env_vars, seed=(BOOTSTRAP_SEED, wave)))
+        if len(youth):
+            age_parts.append(bootstrap_intervals(youth, env_vars, seed=(BOOTSTRAP_SEED, wave)))
+
+    order = ['Variable', 'Country', 'Wave']
+    env_ci = pd.concat(env_parts, ignore_index=True).sort_values(order, ignore_index=True)
+    age_ci = pd.concat(age_parts, ignore_index=True).sort_values(order, ignore_index=True)
+
+    # Save the intervals in long format: one row per country, wave and variable
+    env_ci.to_csv(ENV_OUTPUT_PATH, index=False)
+    age_ci.to_csv(AGE_OUTPUT_PATH, index=False)
+
+    print(f"Confidence intervals saved to '{ENV_OUTPUT_PATH}' and '{AGE_OUTPUT_PATH}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+import os
+
+import pandas as pd
+from dashboard.cube import ALL_AGES, CUBE_INDEX, YOUTH_AGE_GROUP
+from dashboard.schema import CUBE_DTYPES
+from scripts.precompute_confidence_intervals import AGE_OUTPUT_PATH as AGE_CI_PATH
+from scripts.precompute_confidence_intervals import ENV_OUTPUT_PATH as ENV_CI_PATH
+from scripts.precompute_env_data import OUTPUT_PATH as ENV_PATH
+from scripts.precomputed_age_data import OUTPUT_PATH as AGE_PATH
+
+OUTPUT_PATH = 'precalculated_data/results_cube.parquet'
+
+
+def long_format(wide, index, age_group, ci_path):
+    """Melt a wide percentage table to one row per variable, country and wave, with its CI if computed."""
+    # Cells without a percentage are kept so charts show the same gaps as the wide tables
+    data = wide.melt(id_vars=index, var_name='Variable', value_name='Percentage_Favorable')
+    if os.path.exists(ci_path):
+        data = data.merge(pd.read_csv(ci_path), on=['Country', 'Wave', 'Variable'], how='left')
+    else:
+        data = data.assign(CI_Low=float('nan'), CI_High=float('nan'))
+    return data.assign(Age_Group=age_group)[CUBE_INDEX + ['Percentage_Favorable', 'CI_Low', 'CI_High']]
+
+
+def main():
+    # The env table repeats the all-ages percentage for every age group, one copy is enough
+    env_data = pd.read_csv(ENV_PATH).drop(columns='Age_Group').drop_duplicates(['Country', 'Wave'])
+    age_data = pd.read_csv(AGE_PATH)
+
+    cube = pd.concat([
+        long_format(env_data, ['Country', 'Wave'], ALL_AGES, ENV_CI_PATH),
+        long_format(age_data, ['Country', 'Wave'], YOUTH_AGE_GROUP, AGE_CI_PATH),
+    ], ignore_index=True)
+
+    # Compact types, sorted by the lookup key so the app can query it by index
+    cube = cube.astype(CUBE_DTYPES)
+    cube = cube.sort_values(CUBE_INDEX, ignore_index=True)
+    cube.to_parquet(OUTPUT_PATH, index=False, compression='zstd')
+
+    print(f"Results cube with {len(cube)} rows saved to '{OUTPUT_PATH}'.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+
+from scripts.aggregation import env_percentages, merge_counts, partial_counts, youth_percentages
+
+# env_percentages and youth_percentages replace the per-(variable, country, wave) loops of
+# the original precompute_env_data.py and precomputed_age_data.py. The loops are kept below
+# as they were (reading a frame instead of data/data.csv) and the vectorized tables must
+# match them. Run from the repository root: python -m pytest
+
+ENV_VARS = ['B001', 'B002', 'B008']
+
+
+def baseline_env(data, env_vars):
+    unique_countries = data['COUNTRY_ALPHA'].dropna().unique()
+    unique_waves = data['S002VS'].dropna().unique()
+    trend_data_list = []
+    for var in env_vars:
+        for country in unique_countries:
+            for wave in unique_waves:
+                wave_data = data[
+                    (data['COUNTRY_ALPHA'] == country) &
+                    (data['S002VS'] == wave) &
+                    (data[var] > 0)
+                ]
+                total_respondents = len(wave_data)
+                if total_respondents == 0:
+                    continue
+                transformed_responses = wave_data[var].apply(lambda x: 5 - x if pd.notna(x) else pd.NA)
+                if var == "B008":
+                    favorable_count = transformed_responses[transformed_responses == 4].count()
+                else:
+                    favorable_count = transformed_responses[transformed_responses.isin([3, 4])].count()
+                if favorable_count == 0:
+                    continue
+                for age_group in [1, 2, 3]:
+                    age_group_data = wave_data[wave_data['X003R2'] == age_group]
+                    if age_group_data.empty:
+                        continue
+                    percentage_favorable = (favorable_count / total_respondents) * 100
+                    trend_data_list.append({
+                        "Variable": var, "Country": country, "Wave": wave,
+                        "Age_Group": age_group, "Percentage_Favorable": percentage_favorable,
+                    })
+    trend_data = pd.DataFrame(trend_data_list)
+    return trend_data.pivot(index=["Country", "Wave", "Age_Group"], columns="Variable",
+                            values="Percentage_Favorable").reset_index()
+
+
+def baseline_youth(data, env_vars):
+    unique_countries = data['COUNTRY_ALPHA'].dropna().unique()
+    unique_waves = data['S002VS'].dropna().unique()
+    age_group = 1
+    trend_data_list = []
+    for var in env_vars:
+        for country in unique_countries:
+            for wave in unique_waves:
+                wave_data = data[
+                    (data['COUNTRY_ALPHA'] == country) &
+                    (data['S002VS'] == wave) &
+                    (data[var] > 0) &
+                    (data['X003R2'] == age_group)
+                ].copy()
+                total_respondents = len(wave_data)
+                if total_respondents == 0:
+                    continue
+                wave_data['Transformed_Response'] = wave_data[var].apply(lambda x: 5 - x if pd.notna(x) else pd.NA)
+                favorable_count = (
+                    (wave_data['Transformed_Response'] == 4).sum()
+                    if var == "B008" else
+                    (wave_data['Transformed_Response'].isin([3, 4])).sum()
+                )
+                percentage_favorable = (favorable_count / total_respondents) * 100
+                trend_data_list.append({
+                    "Country": country, "Wave": wave, "Variable": var, "Percentage_Favorable": percentage_favorable,
+                })
+    trend_data = pd.DataFrame(trend_data_list)
+    return trend_data.pivot(index=["Country", "Wave"], columns="Variable",
+                            values="Percentage_Favorable").reset_index()
+
+
+def survey_data(rows=3000, seed=7):
+    """Raw WVS-shaped rows: missing and negative (invalid) answers, and respondents without an age group."""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'COUNTRY_ALPHA': rng.choice(['AUS', 'CAN', 'DEU', 'NIR'], rows),
+        'S002VS': rng.choice([3, 5, 6, 7], rows),
+        'X003R2': rng.choice([1.0, 2.0, 3.0, np.nan], rows, p=[0.3, 0.3, 0.3, 0.1]),
+    })
+    for var in ENV_VARS:
+        data[var] = rng.choice([-5.0, -2.0, -1.0, 1.0, 2.0, 3.0, 4.0, np.nan], rows)
+    # A country and wave where nobody answered B002 validly, and a youth group without favorable B008 answers
+    data.loc[(data['COUNTRY_ALPHA'] == 'NIR') & (data['S002VS'] == 3), 'B002'] = -1.0
+    youth_deu_7 = (data['COUNTRY_ALPHA'] == 'DEU') & (data['S002VS'] == 7) & (data['X003R2'] == 1)
+    data.loc[youth_deu_7 & (data['B008'] == 1), 'B008'] = 2.0
+    return data
+
+
+def test_env_percentages_match_the_baseline_loop():
+    data = survey_data()
+    tm.assert_frame_equal(env_percentages(partial_counts(data, ENV_VARS), ENV_VARS), baseline_env(data, ENV_VARS))
+
+
+def test_youth_percentages_match_the_baseline_loop():
+    data = survey_data()
+    tm.assert_frame_equal(youth_percentages(partial_counts(data, ENV_VARS), ENV_VARS), baseline_youth(data, ENV_VARS))
+
+
+def test_counts_merged_from_chunks_match_one_pass():
+    data = survey_data()
+    counts = merge_counts(partial_counts(data.iloc[start:start + 700], ENV_VARS) for start in range(0, len(data), 700))
+    tm.assert_frame_equal(env_percentages(counts, ENV_VARS), baseline_env(data, ENV_VARS))
+    tm.assert_frame_equal(youth_percentages(counts, ENV_VARS), baseline_youth(data, ENV_VARS))
@@ -0,0 +1,24 @@
+from dashboard import datasets
+from mappings.country_mapping import country_info
+from mappings.country_registry import countries
+
+# The registry every dataset is joined through. Run from the repository root: python -m pytest
+
+
+def test_every_epi_region_resolves():
+    epi_data = datasets.DATASETS['epi_data'].read()
+    unknown = sorted(set(epi_data.loc[countries.to_iso3(epi_data['regionCode']).isna(), 'region']))
+    assert unknown == []
+
+
+def test_wvs_countries_keep_their_names():
+    for info in country_info:
+        assert countries.name(info['country_3']) == info['country_name']
+        for key in (info['country_name'], info['country_2'], info['country_code']):
+            assert countries.iso3(key) == info['country_3']
+
+
+def test_names_codes_and_aliases():
+    assert countries.iso3('is') == countries.iso3('ISL') == countries.iso3('352') == countries.iso3('Iceland') == 'ISL'
+    assert countries.iso3('Russian Federation') == countries.iso3('Russia') == 'RUS'
+    assert countries.iso3('Atlantis') is None
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pandas.testing as tm
+import pyarrow as pa
+
+from scripts.ingest import RAW_DATA_PATH, cache_is_fresh, csv_column_types, open_cache, read_chunks
+
+# scripts/convert_to_parquet.py on a small WVS-shaped CSV that, like the real file, has text
+# columns next to the answer codes. Run from the repository root: python -m pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+READ_COLUMNS = ['COUNTRY_ALPHA', 'S002VS', 'X003R2', 'S017', 'B001', 'B008']
+
+
+def write_raw_csv(directory):
+    rows = 40
+    data = pd.DataFrame({
+        'version': ['4-0-0'] * rows,
+        'doi': ['doi.org/10.14281/18241.24'] * rows,
+        'COW_ALPHA': ['AUL', 'CAN'] * (rows // 2),
+        'COUNTRY_ALPHA': ['AUS', 'CAN'] * (rows // 2),
+        'S002VS': [5] * (rows // 2) + [7] * (rows // 2),
+        'X003R2': [1, 2, 3, None] * (rows // 4),
+        # 1 in the first rows, as in the early surveys, a fractional weight later
+        'S017': [1] * (rows - 5) + [0.83] * 5,
+        'B001': [1, 2, -1, None] * (rows // 4),
+        'B008': [None] * (rows // 2) + [1, 2, 3, -2] * (rows // 8),
+    })
+    os.makedirs(os.path.join(directory, 'data'))
+    data.to_csv(os.path.join(directory, RAW_DATA_PATH), index=False)
+
+
+def test_text_columns_are_read_as_strings(tmp_path):
+    write_raw_csv(tmp_path)
+    types = csv_column_types(os.path.join(tmp_path, RAW_DATA_PATH))
+    assert types['version'] == types['doi'] == types['COW_ALPHA'] == pa.string()
+    assert types['S017'] == types['X003R2'] == types['B001'] == pa.float64()
+    assert types['S002VS'] == pa.int64()
+
+
+def test_converted_cache_matches_the_csv(tmp_path, monkeypatch):
+    write_raw_csv(tmp_path)
+    subprocess.run([sys.executable, '-m', 'scripts.convert_to_parquet'], cwd=tmp_path, check=True,
+                   env={**os.environ, 'PYTHONPATH': REPO_ROOT}, capture_output=True)
+    monkeypatch.chdir(tmp_path)
+    assert cache_is_fresh()
+    assert open_cache().schema.field('version').type == pa.string()
+
+    from_cache = pd.concat(read_chunks(READ_COLUMNS), ignore_index=True)
+    os.utime(RAW_DATA_PATH)  # A newer CSV makes the cache stale, so the CSV is read instead
+    assert not cache_is_fresh()
+    from_csv = pd.concat(read_chunks(READ_COLUMNS), ignore_index=True)
+
+    def ordered(data):
+        return data.sort_values(READ_COLUMNS, ignore_index=True)
+    tm.assert_frame_equal(ordered(from_cache), ordered(from_csv))
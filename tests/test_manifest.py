@@ -0,0 +1,106 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pandas.testing as tm
+import pytest
+
+from scripts import manifest
+from scripts.aggregation import env_percentages, youth_percentages
+from scripts.ingest import RAW_DATA_PATH
+
+# incremental_counts() after a change to the variables or the data must give what a full
+# rebuild gives. Each test converts a small WVS-shaped CSV to the Parquet cache, counts it,
+# changes something and counts again. Run from the repository root: python -m pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENV_VARS = ['B001', 'B002', 'B008']
+
+
+def survey_data(rows=4000, seed=11):
+    """Raw rows with missing and negative answers, survey weights and respondents without an age group."""
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'COUNTRY_ALPHA': rng.choice(['AUS', 'CAN', 'DEU', 'NIR'], rows),
+        'S002VS': rng.choice([5, 6, 7], rows),
+        'X003R2': rng.choice([1.0, 2.0, 3.0, np.nan], rows, p=[0.3, 0.3, 0.25, 0.15]),
+        'S017': rng.choice([0.5, 1.0, 1.25, np.nan], rows),
+    })
+    for var in ENV_VARS:
+        data[var] = rng.choice([-2.0, -1.0, 1.0, 2.0, 3.0, 4.0, np.nan], rows)
+    return data
+
+
+def write_data(data):
+    """Write the raw CSV and convert it to the Parquet cache, as scripts/build.py does."""
+    os.makedirs('data', exist_ok=True)
+    data.to_csv(RAW_DATA_PATH, index=False)
+    subprocess.run([sys.executable, '-m', 'scripts.convert_to_parquet'], check=True, capture_output=True,
+                   env={**os.environ, 'PYTHONPATH': REPO_ROOT})
+
+
+def full_rebuild(env_vars):
+    shutil.rmtree(manifest.STATE_PATH, ignore_errors=True)
+    return manifest.incremental_counts(env_vars)
+
+
+def assert_same_results(counts, expected, env_vars):
+    tm.assert_frame_equal(env_percentages(counts, env_vars), env_percentages(expected, env_vars))
+    tm.assert_frame_equal(youth_percentages(counts, env_vars), youth_percentages(expected, env_vars))
+    # Variables counted later come last; the order of the columns does not matter
+    columns = sorted(expected.columns)
+    tm.assert_frame_equal(counts[columns].sort_index(), expected[columns].sort_index(), check_dtype=False)
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_data(survey_data())
+    return tmp_path
+
+
+def test_added_variable(workdir, capsys):
+    manifest.incremental_counts(['B001', 'B008'])
+    capsys.readouterr()
+    counts = manifest.incremental_counts(ENV_VARS)
+    assert "new or changed variables: B002" in capsys.readouterr().out
+    assert_same_results(counts, full_rebuild(ENV_VARS), ENV_VARS)
+
+
+def test_changed_partition(workdir, capsys):
+    manifest.incremental_counts(ENV_VARS)
+    data = survey_data()
+    changed = (data['COUNTRY_ALPHA'] == 'CAN') & (data['S002VS'] == 6)
+    data.loc[changed, 'B002'] = 1.0
+    write_data(data)
+    capsys.readouterr()
+    counts = manifest.incremental_counts(ENV_VARS)
+    assert "Recomputing 1 changed" in capsys.readouterr().out
+    assert_same_results(counts, full_rebuild(ENV_VARS), ENV_VARS)
+
+
+def test_removed_partition(workdir, capsys):
+    manifest.incremental_counts(ENV_VARS)
+    data = survey_data()
+    write_data(data[~((data['COUNTRY_ALPHA'] == 'DEU') & (data['S002VS'] == 7))])
+    capsys.readouterr()
+    counts = manifest.incremental_counts(ENV_VARS)
+    assert "Recomputing 1 changed" in capsys.readouterr().out
+    assert ('DEU', 7) not in set(zip(counts.index.get_level_values(0), counts.index.get_level_values(1)))
+    assert_same_results(counts, full_rebuild(ENV_VARS), ENV_VARS)
+
+
+def test_rows_without_age_group_are_counted_once(workdir):
+    # Respondents without an X003R2 count towards the all-ages percentages; adding a variable
+    # used to join their rows to each other and count them twice
+    manifest.incremental_counts(['B001'])
+    counts = manifest.incremental_counts(ENV_VARS)
+    expected = full_rebuild(ENV_VARS)
+    no_age = counts.index.get_level_values(2).isna()
+    assert no_age.sum() == expected.index.get_level_values(2).isna().sum() > 0
+    tm.assert_frame_equal(counts[no_age].sort_index(), expected[expected.index.get_level_values(2).isna()].sort_index(),
+                          check_dtype=False)
+    assert_same_results(counts, expected, ENV_VARS)